@@ -19,7 +19,16 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///studyai.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, 'uploads')
-    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
+    app.config['DATA_FOLDER'] = os.path.join(app.root_path, 'data')
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max request size
+    app.config['UPLOAD_CHUNK_SIZE'] = 8 * 1024 * 1024  # 8MB max chunk for resumable uploads
+    app.config['MAX_UPLOAD_SIZE'] = int(os.environ.get('MAX_UPLOAD_SIZE', 2 * 1024 * 1024 * 1024))  # 2GB max resumable upload
+    app.config['FRAGMENT_CACHE_PATH'] = os.environ.get('FRAGMENT_CACHE_PATH', os.path.join(app.root_path, 'cache', 'fragments.sqlite'))
+    app.config['FRAGMENT_CACHE_MAX_ENTRIES'] = 10000
+    app.config['RATELIMIT_ENABLED'] = os.environ.get('RATELIMIT_ENABLED', '1') == '1'
+    app.config['ADMISSION_MAX_IN_FLIGHT'] = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 16))  # expensive requests per worker
+    app.config['ADMISSION_MAX_QUEUE'] = int(os.environ.get('ADMISSION_MAX_QUEUE', 32))
+    app.config['ADMISSION_QUEUE_TIMEOUT'] = int(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 10))  # seconds
     
     # Ensure upload directory exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -29,18 +38,37 @@ def create_app():
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     
+    # Shared rendered-page cache for study views
+    from studyai_web_deployment.app.utils.fragment_cache import init_fragment_cache
+    init_fragment_cache(app)
+    
      # Register blueprints
     from studyai_web_deployment.app.routes.main import main
     from studyai_web_deployment.app.routes.auth import auth
     from studyai_web_deployment.app.routes.study import study
+    from studyai_web_deployment.app.routes.uploads import uploads
 
     
     app.register_blueprint(main)
     app.register_blueprint(auth)
     app.register_blueprint(study)
+    app.register_blueprint(uploads)
+    
+    # Register CLI commands
+    from studyai_web_deployment.app.cli import register_commands
+    register_commands(app)
     
-    # Create database tables
+    # Create database tables and add columns missing from older databases
+    from studyai_web_deployment.app.utils.schema import upgrade_schema
+    from studyai_web_deployment.app.utils.document_processor import fail_stale_processing
+    from studyai_web_deployment.app.utils.scheduler import schedule_all_unreviewed_cards
+    from studyai_web_deployment.app.utils.storage import migrate_legacy_indexes
     with app.app_context():
         db.create_all()
+        upgrade_schema()
+        schedule_all_unreviewed_cards()
+        migrate_legacy_indexes()
+        # Ingestion lives in worker memory, so a restart strands documents mid-processing
+        fail_stale_processing()
     
     return app
@@ -0,0 +1,92 @@
+import click
+from flask.cli import with_appcontext
+from studyai_web_deployment.app.models.models import User
+from studyai_web_deployment.app.utils.bulk_import import import_course
+from studyai_web_deployment.app.utils.document_processor import fail_stale_processing
+from studyai_web_deployment.app.utils.schema import upgrade_schema
+from studyai_web_deployment.app.utils.scheduler import schedule_all_unreviewed_cards
+from studyai_web_deployment.app.utils.storage import collect_garbage, disk_usage, migrate_legacy_indexes
+
+
+def _format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} TB'
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db_command():
+    """Add columns introduced since the database was created."""
+    if not upgrade_schema(echo=click.echo):
+        click.echo('Database schema is up to date.')
+    scheduled = schedule_all_unreviewed_cards()
+    if scheduled:
+        click.echo(f'Scheduled {scheduled} flashcards for review.')
+    moved = migrate_legacy_indexes()
+    if moved:
+        click.echo(f'Moved {moved} document indexes into the data folder.')
+
+@click.command('gc-storage')
+@click.option('--dry-run', is_flag=True, help='Report what would be removed without deleting anything.')
+@with_appcontext
+def gc_storage_command(dry_run):
+    """Remove uploads and indexes no document refers to any more."""
+    if not dry_run:
+        stale = fail_stale_processing()
+        if stale:
+            click.echo(f'Marked {stale} interrupted documents as failed.')
+
+    report = collect_garbage(dry_run=dry_run)
+    if not report:
+        click.echo('Nothing to reclaim.')
+        return
+
+    verb = 'Would reclaim' if dry_run else 'Reclaimed'
+    total = 0
+    for category, entry in sorted(report.items()):
+        click.echo(f"{category.replace('_', ' ')}: {entry['count']} ({_format_bytes(entry['bytes'])})")
+        total += entry['bytes']
+    click.echo(f'{verb} {_format_bytes(total)} in total.')
+
+@click.command('disk-usage')
+@with_appcontext
+def disk_usage_command():
+    """Show upload and index disk usage per user."""
+    click.echo(f"{'User':<24} {'Documents':>10} {'Uploads':>12} {'Indexes':>12}")
+    for user, upload_bytes, index_bytes, documents in disk_usage():
+        click.echo(f'{user.username:<24} {documents:>10} {_format_bytes(upload_bytes):>12} {_format_bytes(index_bytes):>12}')
+
+@click.command('import-course')
+@click.argument('username')
+@click.argument('source', type=click.Path(exists=True))
+@click.option('--workers', type=int, default=None, help='Ingestion processes to run (defaults to the CPU count).')
+@click.option('--checkpoint', type=click.Path(), default=None, help='Checkpoint file used to resume an interrupted import.')
+@click.option('--title-prefix', default='', help='Text prepended to every document title.')
+@click.option('--retry-failed', is_flag=True, help='Also retry files that failed in a previous run.')
+@with_appcontext
+def import_course_command(username, source, workers, checkpoint, title_prefix, retry_failed):
+    """Import a course folder or archive as documents of USERNAME."""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f'No user named {username}')
+
+    try:
+        stats = import_course(user, source, workers=workers, checkpoint_path=checkpoint,
+                              title_prefix=title_prefix, retry_failed=retry_failed, echo=click.echo)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f"Imported {stats['ingested']} documents ({stats['failed']} failed) "
+               f"from {stats['files']} files in {stats['elapsed']:.1f}s")
+    click.echo(f"Ingestion: {stats['files_per_second']:.1f} files/s, "
+               f"{_format_bytes(stats['bytes_per_second'])}/s")
+    if stats['failed']:
+        click.echo(f"Run again with --retry-failed to retry failures. Checkpoint: {stats['checkpoint']}")
+
+def register_commands(app):
+    app.cli.add_command(upgrade_db_command)
+    app.cli.add_command(gc_storage_command)
+    app.cli.add_command(disk_usage_command)
+    app.cli.add_command(import_course_command)
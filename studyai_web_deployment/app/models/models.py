@@ -20,16 +20,40 @@ class User(db.Model, UserMixin):
     def __repr__(self):
         return f'<User {self.username}>'
 
+class Blob(db.Model):
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    path = db.Column(db.String(255), nullable=False)
+    ref_count = db.Column(db.Integer, default=1, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    documents = db.relationship('Document', backref='blob', lazy='dynamic')
+    
+    def __repr__(self):
+        return f'<Blob {self.sha256}>'
+
 class Document(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     filename = db.Column(db.String(100), nullable=False)
     file_path = db.Column(db.String(255), nullable=False)
-    content_type = db.Column(db.String(50))
+    content_type = db.Column(db.String(255))
+    content_version = db.Column(db.Integer, default=1, nullable=False)
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('blob.sha256'), index=True)
+    index_size = db.Column(db.BigInteger, default=0)
+    status = db.Column(db.String(20), default='ready', nullable=False)  # processing, ready or failed
+    processing_error = db.Column(db.Text)
+    processing_started_at = db.Column(db.DateTime)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     flashcards = db.relationship('Flashcard', backref='document', lazy='dynamic', cascade="all, delete-orphan")
     quizzes = db.relationship('Quiz', backref='document', lazy='dynamic', cascade="all, delete-orphan")
+    stats = db.relationship('UserDocumentStats', backref='document', lazy='dynamic', cascade="all, delete-orphan")
+    
+    def bump_content_version(self):
+        """
+        Mark generated study material as changed so cached pages are re-rendered
+        """
+        self.content_version = (self.content_version or 1) + 1
     
     def __repr__(self):
         return f'<Document {self.title}>'
@@ -40,16 +64,40 @@ class Flashcard(db.Model):
     back = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     document_id = db.Column(db.Integer, db.ForeignKey('document.id'), nullable=False)
+    reviews = db.relationship('FlashcardReview', backref='flashcard', lazy='dynamic', cascade="all, delete-orphan")
     
     def __repr__(self):
         return f'<Flashcard {self.id}>'
 
+class FlashcardReview(db.Model):
+    # The due queue is read with a range scan over (user_id, due_at)
+    __table_args__ = (
+        db.Index('ix_flashcard_review_user_due', 'user_id', 'due_at'),
+        db.UniqueConstraint('user_id', 'flashcard_id', name='uq_flashcard_review_user_card'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    ease_factor = db.Column(db.Float, default=2.5, nullable=False)
+    interval_days = db.Column(db.Integer, default=0, nullable=False)
+    repetitions = db.Column(db.Integer, default=0, nullable=False)
+    lapses = db.Column(db.Integer, default=0, nullable=False)
+    due_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_reviewed_at = db.Column(db.DateTime)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    flashcard_id = db.Column(db.Integer, db.ForeignKey('flashcard.id'), nullable=False)
+    
+    def __repr__(self):
+        return f'<FlashcardReview {self.flashcard_id} due {self.due_at}>'
+
 class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), default="Generated Quiz")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set when the quiz is regenerated; archived quizzes keep their attempts and question stats
+    archived_at = db.Column(db.DateTime)
     document_id = db.Column(db.Integer, db.ForeignKey('document.id'), nullable=False)
     questions = db.relationship('QuizQuestion', backref='quiz', lazy='dynamic', cascade="all, delete-orphan")
+    attempts = db.relationship('QuizAttempt', backref='quiz', lazy='dynamic', cascade="all, delete-orphan")
     
     def __repr__(self):
         return f'<Quiz {self.id}>'
@@ -59,6 +107,7 @@ class QuizQuestion(db.Model):
     question_text = db.Column(db.Text, nullable=False)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
     options = db.relationship('QuizOption', backref='question', lazy='dynamic', cascade="all, delete-orphan")
+    stats = db.relationship('UserQuestionStats', backref='question', lazy='dynamic', cascade="all, delete-orphan")
     
     def __repr__(self):
         return f'<QuizQuestion {self.id}>'
@@ -71,3 +120,93 @@ class QuizOption(db.Model):
     
     def __repr__(self):
         return f'<QuizOption {self.id}>'
+
+class QuizAttempt(db.Model):
+    __table_args__ = (db.Index('ix_quiz_attempt_user_created', 'user_id', 'created_at'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    score = db.Column(db.Integer, nullable=False)
+    total = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    answers = db.relationship('QuizAnswer', backref='attempt', lazy='dynamic', cascade="all, delete-orphan")
+    
+    def __repr__(self):
+        return f'<QuizAttempt {self.id}>'
+
+class QuizAnswer(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    is_correct = db.Column(db.Boolean, default=False, nullable=False)
+    attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempt.id'), nullable=False, index=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('quiz_question.id'), nullable=False)
+    option_id = db.Column(db.Integer, db.ForeignKey('quiz_option.id'))
+    
+    def __repr__(self):
+        return f'<QuizAnswer {self.id}>'
+
+class UserDocumentStats(db.Model):
+    __table_args__ = (db.UniqueConstraint('user_id', 'document_id', name='uq_user_document_stats'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    questions_answered = db.Column(db.Integer, default=0, nullable=False)
+    correct_answers = db.Column(db.Integer, default=0, nullable=False)
+    best_percentage = db.Column(db.Integer, default=0, nullable=False)
+    last_percentage = db.Column(db.Integer, default=0, nullable=False)
+    last_attempt_at = db.Column(db.DateTime)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), nullable=False)
+    
+    @property
+    def accuracy(self):
+        return self.correct_answers / self.questions_answered if self.questions_answered else 0
+    
+    def __repr__(self):
+        return f'<UserDocumentStats {self.user_id}:{self.document_id}>'
+
+class UserQuestionStats(db.Model):
+    __table_args__ = (db.UniqueConstraint('user_id', 'question_id', name='uq_user_question_stats'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    correct_answers = db.Column(db.Integer, default=0, nullable=False)
+    last_correct = db.Column(db.Boolean, default=False, nullable=False)
+    last_seen_at = db.Column(db.DateTime)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('quiz_question.id'), nullable=False)
+    
+    @property
+    def accuracy(self):
+        return self.correct_answers / self.attempts if self.attempts else 0
+    
+    def __repr__(self):
+        return f'<UserQuestionStats {self.user_id}:{self.question_id}>'
+
+class RateLimitBucket(db.Model):
+    __table_args__ = (db.UniqueConstraint('user_id', 'endpoint', name='uq_rate_limit_bucket_user_endpoint'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    endpoint = db.Column(db.String(64), nullable=False)
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)  # Unix time of the last refill
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    
+    def __repr__(self):
+        return f'<RateLimitBucket {self.user_id}:{self.endpoint}>'
+
+class UploadSession(db.Model):
+    id = db.Column(db.String(36), primary_key=True)
+    title = db.Column(db.String(100), nullable=False)
+    filename = db.Column(db.String(100), nullable=False)
+    content_type = db.Column(db.String(255))
+    total_size = db.Column(db.BigInteger, nullable=False)
+    checksum = db.Column(db.String(64), nullable=False)
+    received = db.Column(db.BigInteger, default=0, nullable=False)
+    temp_path = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    
+    def __repr__(self):
+        return f'<UploadSession {self.id}>'
@@ -30,6 +30,9 @@ class UploadDocumentForm(FlaskForm):
     title = StringField('Document Title', validators=[DataRequired(), Length(max=100)])
     submit = SubmitField('Upload & Process')
 
+class DeleteDocumentForm(FlaskForm):
+    submit = SubmitField('Delete')
+
 class QueryForm(FlaskForm):
     query = TextAreaField('Ask a question about your document', validators=[DataRequired()])
     submit = SubmitField('Submit')
@@ -1,12 +1,13 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import current_user, login_required
 from werkzeug.utils import secure_filename
-import os
+from datetime import datetime
 import uuid
 from studyai_web_deployment.app.models.models import Document
 from studyai_web_deployment.app import db
-from studyai_web_deployment.app.routes.forms import UploadDocumentForm
-from studyai_web_deployment.app.utils.document_processor import process_document
+from studyai_web_deployment.app.routes.forms import UploadDocumentForm, DeleteDocumentForm
+from studyai_web_deployment.app.utils.document_processor import process_document, fail_processing
+from studyai_web_deployment.app.utils.storage import incoming_path, store_file, delete_document as remove_document
 
 
 main = Blueprint('main', __name__)
@@ -18,8 +19,10 @@ def index():
 @main.route('/dashboard')
 @login_required
 def dashboard():
+    # Not cached: the delete buttons carry a CSRF token that expires, so a stored page would go stale
     documents = Document.query.filter_by(user_id=current_user.id).order_by(Document.uploaded_at.desc()).all()
-    return render_template('main/dashboard.html', title='Dashboard', documents=documents)
+    return render_template('main/dashboard.html', title='Dashboard', documents=documents,
+                           delete_form=DeleteDocumentForm())
 
 @main.route('/about')
 def about():
@@ -43,35 +46,55 @@ def upload_document():
             # Generate a unique ID for this document
             doc_id = str(uuid.uuid4())
             
-            # Create a directory for this document if it doesn't exist
-            user_upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], str(current_user.id))
-            doc_dir = os.path.join(user_upload_dir, doc_id)
-            os.makedirs(doc_dir, exist_ok=True)
-            
-            # Save the file
+            # Save the file, then move it into the blob store so identical files are stored once
             filename = secure_filename(file.filename)
-            file_path = os.path.join(doc_dir, filename)
-            file.save(file_path)
+            temp_path = incoming_path(f'{doc_id}.part')
+            file.save(temp_path)
+            blob = store_file(temp_path)
             
             # Create document record in database
             document = Document(
                 title=form.title.data,
                 filename=filename,
-                file_path=file_path,
+                file_path=blob.path,
                 content_type=file.content_type,
+                blob_sha256=blob.sha256,
+                status='processing',
+                processing_started_at=datetime.utcnow(),
                 user_id=current_user.id
             )
             
             db.session.add(document)
             db.session.commit()
+            document_id = document.id
             
             # Process the document
             try:
                 process_document(document)
                 flash('File successfully uploaded and processed')
-                return redirect(url_for('study.view_document', doc_id=document.id))
+                return redirect(url_for('study.view_document', doc_id=document_id))
             except Exception as e:
+                fail_processing(document_id, e)
                 flash(f'Error processing file: {str(e)}')
                 return redirect(url_for('main.dashboard'))
     
     return render_template('main/upload.html', title='Upload Document', form=form)
+
+@main.route('/document/<int:doc_id>/delete', methods=['POST'])
+@login_required
+def delete_document(doc_id):
+    form = DeleteDocumentForm()
+    if not form.validate_on_submit():
+        flash('Your session has expired, please try again')
+        return redirect(url_for('main.dashboard'))
+    
+    document = Document.query.get_or_404(doc_id)
+    
+    # Check if the document belongs to the current user
+    if document.user_id != current_user.id:
+        flash('You do not have permission to delete this document')
+        return redirect(url_for('main.dashboard'))
+    
+    remove_document(document)
+    flash('Document deleted')
+    return redirect(url_for('main.dashboard'))
@@ -1,12 +1,41 @@
+from datetime import datetime
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import current_user, login_required
 from studyai_web_deployment.app.models.models import Document, Flashcard, Quiz, QuizQuestion, QuizOption
 from studyai_web_deployment.app import db
 from studyai_web_deployment.app.routes.forms import QueryForm
 from studyai_web_deployment.app.utils.document_processor import query_document, generate_flashcards, generate_quiz
+from studyai_web_deployment.app.utils.fragment_cache import CachedPage
+from studyai_web_deployment.app.utils.scheduler import (
+    schedule_new_cards, schedule_unreviewed_cards, due_cards, submit_reviews, MIN_GRADE, MAX_GRADE
+)
+from studyai_web_deployment.app.utils.rate_limit import rate_limit, admission_control
+from studyai_web_deployment.app.utils.progress import record_attempt, document_progress, weakest_questions
 
 study = Blueprint('study', __name__)
 
+def _current_quiz(doc_id):
+    return Quiz.query.filter_by(document_id=doc_id, archived_at=None).first()
+
+def _will_generate_flashcards(doc_id):
+    """
+    Whether a flashcards request calls the model: to regenerate, or because no deck exists yet
+    """
+    return request.method == 'POST' or Flashcard.query.filter_by(document_id=doc_id).first() is None
+
+def _will_generate_quiz(doc_id):
+    return request.method == 'POST' or _current_quiz(doc_id) is None
+
+def _not_ready_message(document):
+    """
+    Explain why a document cannot be studied yet, or return None once it is indexed
+    """
+    if document.status == 'processing':
+        return 'This document is still being processed, please try again shortly'
+    if document.status == 'failed':
+        return f'This document could not be processed: {document.processing_error}'
+    return None
+
 @study.route('/document/<int:doc_id>')
 @login_required
 def view_document(doc_id):
@@ -22,6 +51,8 @@ def view_document(doc_id):
 
 @study.route('/document/<int:doc_id>/query', methods=['POST'])
 @login_required
+@rate_limit('query', limit=30, period=60)
+@admission_control()
 def query(doc_id):
     document = Document.query.get_or_404(doc_id)
     
@@ -29,6 +60,10 @@ def query(doc_id):
     if document.user_id != current_user.id:
         return jsonify({'error': 'Permission denied'}), 403
     
+    not_ready = _not_ready_message(document)
+    if not_ready:
+        return jsonify({'error': not_ready, 'status': document.status}), 409
+    
     data = request.json
     query_text = data.get('query')
     
@@ -43,6 +78,8 @@ def query(doc_id):
 
 @study.route('/document/<int:doc_id>/flashcards', methods=['GET', 'POST'])
 @login_required
+@rate_limit('regenerate_flashcards', limit=5, period=600, when=_will_generate_flashcards)
+@admission_control(when=_will_generate_flashcards)
 def flashcards(doc_id):
     document = Document.query.get_or_404(doc_id)
     
@@ -51,6 +88,18 @@ def flashcards(doc_id):
         flash('You do not have permission to view this document')
         return redirect(url_for('main.dashboard'))
     
+    not_ready = _not_ready_message(document)
+    if not_ready:
+        flash(not_ready)
+        return redirect(url_for('study.view_document', doc_id=doc_id))
+    
+    # Serve the rendered deck while it has not been regenerated
+    if request.method == 'GET':
+        page = CachedPage(f'flashcards:{current_user.id}:{doc_id}', document.content_version)
+        cached = page.cached_response()
+        if cached is not None:
+            return cached
+    
     # Check if flashcards already exist for this document
     existing_flashcards = Flashcard.query.filter_by(document_id=doc_id).all()
     
@@ -60,12 +109,14 @@ def flashcards(doc_id):
             if existing_flashcards:
                 for card in existing_flashcards:
                     db.session.delete(card)
+                document.bump_content_version()
                 db.session.commit()
             
             # Generate new flashcards
             flashcard_data = generate_flashcards(document)
             
             # Save flashcards to database
+            new_cards = []
             for card_data in flashcard_data:
                 flashcard = Flashcard(
                     front=card_data['front'],
@@ -73,7 +124,13 @@ def flashcards(doc_id):
                     document_id=doc_id
                 )
                 db.session.add(flashcard)
+                new_cards.append(flashcard)
             
+            # Put the new cards in the owner's review queue
+            db.session.flush()
+            schedule_new_cards(document.user_id, [card.id for card in new_cards])
+            
+            document.bump_content_version()
             db.session.commit()
             
             if request.method == 'POST':
@@ -85,10 +142,60 @@ def flashcards(doc_id):
             flash(f'Error generating flashcards: {str(e)}')
     
     flashcards = Flashcard.query.filter_by(document_id=doc_id).all()
-    return render_template('study/flashcards.html', title=f'Flashcards - {document.title}', document=document, flashcards=flashcards)
+    if flashcards:
+        schedule_unreviewed_cards(current_user.id, doc_id)
+    page = CachedPage(f'flashcards:{current_user.id}:{doc_id}', document.content_version)
+    html = render_template('study/flashcards.html', title=f'Flashcards - {document.title}', document=document, flashcards=flashcards)
+    if not flashcards:
+        return html
+    
+    return page.store(html)
+
+@study.route('/review/due')
+@login_required
+def review_due():
+    limit = request.args.get('limit', 20, type=int)
+    if limit <= 0:
+        return jsonify({'error': 'Invalid limit'}), 400
+    
+    cards = due_cards(current_user.id, limit)
+    return jsonify({'cards': [{
+        'id': card.id,
+        'front': card.front,
+        'back': card.back,
+        'document_id': card.document_id,
+        'due_at': review.due_at.isoformat(),
+        'repetitions': review.repetitions
+    } for review, card in cards]})
+
+@study.route('/review', methods=['POST'])
+@login_required
+def submit_review():
+    data = request.json or {}
+    entries = data.get('reviews', [])
+    
+    if not entries:
+        return jsonify({'error': 'No reviews provided'}), 400
+    
+    grades = {}
+    for entry in entries:
+        card_id = entry.get('card_id')
+        grade = entry.get('grade')
+        if not isinstance(card_id, int) or not isinstance(grade, int) or not MIN_GRADE <= grade <= MAX_GRADE:
+            return jsonify({'error': f'Each review needs an integer card_id and a grade from {MIN_GRADE} to {MAX_GRADE}'}), 400
+        grades[card_id] = grade
+    
+    reviews = submit_reviews(current_user.id, grades)
+    return jsonify({'success': True, 'reviews': [{
+        'card_id': review.flashcard_id,
+        'due_at': review.due_at.isoformat(),
+        'interval_days': review.interval_days
+    } for review in reviews]})
 
 @study.route('/document/<int:doc_id>/quiz', methods=['GET', 'POST'])
 @login_required
+@rate_limit('regenerate_quiz', limit=5, period=600, when=_will_generate_quiz)
+@admission_control(when=_will_generate_quiz)
 def quiz(doc_id):
     document = Document.query.get_or_404(doc_id)
     
@@ -97,14 +204,27 @@ def quiz(doc_id):
         flash('You do not have permission to view this document')
         return redirect(url_for('main.dashboard'))
     
+    not_ready = _not_ready_message(document)
+    if not_ready:
+        flash(not_ready)
+        return redirect(url_for('study.view_document', doc_id=doc_id))
+    
+    # Serve the rendered quiz while it has not been regenerated
+    if request.method == 'GET':
+        page = CachedPage(f'quiz:{current_user.id}:{doc_id}', document.content_version)
+        cached = page.cached_response()
+        if cached is not None:
+            return cached
+    
     # Check if a quiz already exists for this document
-    existing_quiz = Quiz.query.filter_by(document_id=doc_id).first()
+    existing_quiz = _current_quiz(doc_id)
     
     if request.method == 'POST' or not existing_quiz:
         try:
-            # Delete existing quiz if regenerating
+            # Archive the existing quiz if regenerating, so past attempts and stats survive
             if existing_quiz:
-                db.session.delete(existing_quiz)
+                existing_quiz.archived_at = datetime.utcnow()
+                document.bump_content_version()
                 db.session.commit()
             
             # Generate new quiz
@@ -131,6 +251,7 @@ def quiz(doc_id):
                     )
                     db.session.add(option)
             
+            document.bump_content_version()
             db.session.commit()
             
             if request.method == 'POST':
@@ -141,7 +262,7 @@ def quiz(doc_id):
                 return jsonify({'error': str(e)}), 500
             flash(f'Error generating quiz: {str(e)}')
     
-    quiz = Quiz.query.filter_by(document_id=doc_id).first()
+    quiz = _current_quiz(doc_id)
     if quiz:
         questions = []
         for question in quiz.questions:
@@ -151,7 +272,9 @@ def quiz(doc_id):
                 'options': [{'id': option.id, 'text': option.option_text} for option in question.options]
             })
         
-        return render_template('study/quiz.html', title=f'Quiz - {document.title}', document=document, quiz=quiz, questions=questions)
+        page = CachedPage(f'quiz:{current_user.id}:{doc_id}', document.content_version)
+        html = render_template('study/quiz.html', title=f'Quiz - {document.title}', document=document, quiz=quiz, questions=questions)
+        return page.store(html)
     else:
         return render_template('study/quiz.html', title=f'Quiz - {document.title}', document=document, quiz=None, questions=None)
 
@@ -170,49 +293,64 @@ def submit_quiz(doc_id):
     if not answers:
         return jsonify({'error': 'No answers provided'}), 400
     
-    quiz = Quiz.query.filter_by(document_id=doc_id).first()
+    quiz = _current_quiz(doc_id)
     if not quiz:
         return jsonify({'error': 'Quiz not found'}), 404
     
+    # Load every question and option in two queries instead of one per answer
+    questions = quiz.questions.all()
+    options_by_question = {}
+    for option in QuizOption.query.filter(QuizOption.question_id.in_([q.id for q in questions])):
+        options_by_question.setdefault(option.question_id, []).append(option)
+    
     # Calculate score
     total_questions = 0
     correct_answers = 0
     results = {}
+    graded = []
     
-    for question in quiz.questions:
+    for question in questions:
         total_questions += 1
         question_id = str(question.id)
+        options = options_by_question.get(question.id, [])
+        correct_option = next((option for option in options if option.is_correct), None)
         
         if question_id in answers:
-            selected_option_id = answers[question_id]
-            selected_option = QuizOption.query.get(selected_option_id)
+            # Only accept options that belong to this question
+            selected_option = next((option for option in options if str(option.id) == str(answers[question_id])), None)
             
             if selected_option and selected_option.is_correct:
                 correct_answers += 1
                 results[question_id] = {'correct': True}
             else:
                 results[question_id] = {'correct': False}
-                
-                # Find the correct option
-                for option in question.options:
-                    if option.is_correct:
-                        results[question_id]['correct_option_id'] = option.id
-                        break
+                if correct_option:
+                    results[question_id]['correct_option_id'] = correct_option.id
+            
+            graded.append((question.id, selected_option.id if selected_option else None, results[question_id]['correct']))
         else:
             results[question_id] = {'correct': False, 'not_answered': True}
+            if correct_option:
+                results[question_id]['correct_option_id'] = correct_option.id
             
-            # Find the correct option
-            for option in question.options:
-                if option.is_correct:
-                    results[question_id]['correct_option_id'] = option.id
-                    break
+            graded.append((question.id, None, False))
     
     score = correct_answers / total_questions if total_questions > 0 else 0
     percentage = round(score * 100)
     
+    # Keep the attempt and update the user's progress aggregates
+    record_attempt(current_user.id, quiz, graded)
+    
     return jsonify({
         'score': correct_answers,
         'total': total_questions,
         'percentage': percentage,
         'results': results
     })
+
+@study.route('/progress')
+@login_required
+def progress():
+    documents = document_progress(current_user.id)
+    questions = weakest_questions(current_user.id)
+    return render_template('study/progress.html', title='Progress', documents=documents, questions=questions)
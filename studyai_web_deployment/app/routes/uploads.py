@@ -0,0 +1,215 @@
+from flask import Blueprint, request, jsonify, current_app, url_for
+from flask_login import current_user, login_required
+from werkzeug.utils import secure_filename
+import os
+import uuid
+from studyai_web_deployment.app.models.models import Document, UploadSession
+from studyai_web_deployment.app import db
+from studyai_web_deployment.app.utils.document_processor import start_processing
+from studyai_web_deployment.app.utils.storage import incoming_path, file_checksum, store_file
+
+
+uploads = Blueprint('uploads', __name__)
+
+# Size of the blocks copied from the request stream to disk
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+def _get_session(upload_id):
+    """
+    Return the current user's upload session, or None if it does not exist
+    """
+    return UploadSession.query.filter_by(id=upload_id, user_id=current_user.id).first()
+
+def _session_state(upload):
+    return {
+        'upload_id': upload.id,
+        'offset': upload.received,
+        'size': upload.total_size,
+        'chunk_size': current_app.config['UPLOAD_CHUNK_SIZE']
+    }
+
+def _document_state(document):
+    return {
+        'document_id': document.id,
+        'status': document.status,
+        'error': document.processing_error,
+        'status_url': url_for('uploads.document_status', doc_id=document.id),
+        'url': url_for('study.view_document', doc_id=document.id)
+    }
+
+def _discard(upload):
+    if os.path.exists(upload.temp_path):
+        os.remove(upload.temp_path)
+    db.session.delete(upload)
+    db.session.commit()
+
+@uploads.route('/uploads', methods=['POST'])
+@login_required
+def create_upload():
+    data = request.json or {}
+    title = (data.get('title') or '').strip()
+    filename = secure_filename(data.get('filename') or '')
+    checksum = (data.get('sha256') or '').strip().lower()
+    size = data.get('size')
+
+    if not title or not filename:
+        return jsonify({'error': 'Missing title or filename'}), 400
+    if len(title) > 100:
+        return jsonify({'error': 'Title must be at most 100 characters'}), 400
+    if not isinstance(size, int) or size <= 0:
+        return jsonify({'error': 'Missing or invalid size'}), 400
+    if size > current_app.config['MAX_UPLOAD_SIZE']:
+        return jsonify({'error': 'File is too large'}), 413
+    if len(checksum) != 64 or any(c not in '0123456789abcdef' for c in checksum):
+        return jsonify({'error': 'Missing or invalid sha256 checksum'}), 400
+
+    upload_id = str(uuid.uuid4())
+    temp_path = incoming_path(f'{upload_id}.part')
+
+    # Create the empty part file so every chunk can be written in place
+    open(temp_path, 'wb').close()
+
+    upload = UploadSession(
+        id=upload_id,
+        title=title,
+        filename=filename,
+        content_type=data.get('content_type'),
+        total_size=size,
+        checksum=checksum,
+        temp_path=temp_path,
+        user_id=current_user.id
+    )
+    db.session.add(upload)
+    db.session.commit()
+
+    return jsonify(_session_state(upload)), 201
+
+@uploads.route('/uploads/<upload_id>', methods=['GET'])
+@login_required
+def upload_status(upload_id):
+    upload = _get_session(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+
+    return jsonify(_session_state(upload))
+
+@uploads.route('/uploads/<upload_id>', methods=['PATCH'])
+@login_required
+def upload_chunk(upload_id):
+    upload = _get_session(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'error': 'Missing Upload-Offset header'}), 400
+
+    # Chunks must be sent in order; tell the client where to resume from
+    if offset != upload.received:
+        return jsonify(dict(_session_state(upload), error='Offset mismatch')), 409
+
+    length = request.content_length
+    if length is None:
+        return jsonify({'error': 'Missing Content-Length header'}), 411
+    if length > current_app.config['UPLOAD_CHUNK_SIZE']:
+        return jsonify({'error': 'Chunk is too large'}), 413
+    if offset + length > upload.total_size:
+        return jsonify({'error': 'Chunk exceeds declared file size'}), 400
+
+    # Stream the body straight to disk so memory use does not depend on the chunk size
+    written = 0
+    with open(upload.temp_path, 'r+b') as f:
+        f.seek(offset)
+        while True:
+            block = request.stream.read(STREAM_BLOCK_SIZE)
+            if not block:
+                break
+            f.write(block)
+            written += len(block)
+
+    # Only advance the offset if no concurrent request moved it in the meantime
+    updated = UploadSession.query.filter_by(id=upload.id, received=offset).update(
+        {'received': offset + written}
+    )
+    db.session.commit()
+    if not updated:
+        db.session.refresh(upload)
+        return jsonify(dict(_session_state(upload), error='Offset mismatch')), 409
+
+    db.session.refresh(upload)
+    return jsonify(_session_state(upload))
+
+@uploads.route('/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def cancel_upload(upload_id):
+    upload = _get_session(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+
+    _discard(upload)
+    return jsonify({'success': True})
+
+@uploads.route('/uploads/<upload_id>/finalize', methods=['POST'])
+@login_required
+def finalize_upload(upload_id):
+    upload = _get_session(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+
+    if upload.received != upload.total_size:
+        return jsonify(dict(_session_state(upload), error='Upload is incomplete')), 409
+
+    checksum = file_checksum(upload.temp_path)
+    if checksum != upload.checksum:
+        _discard(upload)
+        return jsonify({'error': 'Checksum mismatch, please upload the file again'}), 422
+
+    # Move the assembled file into the blob store, sharing it if the content is already there
+    blob = store_file(upload.temp_path, checksum)
+
+    document = Document(
+        title=upload.title,
+        filename=upload.filename,
+        file_path=blob.path,
+        content_type=upload.content_type,
+        blob_sha256=blob.sha256,
+        status='processing',
+        user_id=current_user.id
+    )
+    db.session.add(document)
+    db.session.delete(upload)
+    db.session.commit()
+
+    # Ingestion of a large file outlasts the request timeout, so run it in the background
+    start_processing(document)
+
+    response = jsonify(_document_state(document))
+    response.status_code = 202
+    response.headers['Location'] = url_for('uploads.document_status', doc_id=document.id)
+    return response
+
+@uploads.route('/documents/<int:doc_id>/process', methods=['POST'])
+@login_required
+def retry_processing(doc_id):
+    document = Document.query.filter_by(id=doc_id, user_id=current_user.id).first()
+    if document is None:
+        return jsonify({'error': 'Document not found'}), 404
+    if document.status != 'failed':
+        return jsonify(dict(_document_state(document), error='Only failed documents can be processed again')), 409
+
+    start_processing(document)
+
+    response = jsonify(_document_state(document))
+    response.status_code = 202
+    response.headers['Location'] = url_for('uploads.document_status', doc_id=document.id)
+    return response
+
+@uploads.route('/documents/<int:doc_id>/status', methods=['GET'])
+@login_required
+def document_status(doc_id):
+    document = Document.query.filter_by(id=doc_id, user_id=current_user.id).first()
+    if document is None:
+        return jsonify({'error': 'Document not found'}), 404
+
+    return jsonify(_document_state(document))
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import mimetypes
+import multiprocessing
+import os
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from flask import current_app
+from werkzeug.utils import secure_filename
+from studyai_web_deployment.app import db
+from studyai_web_deployment.app.models.models import Document
+from studyai_web_deployment.app.utils.extractors import is_supported
+from studyai_web_deployment.app.utils.storage import file_checksum, store_file
+
+# Documents created per database commit
+CREATE_BATCH_SIZE = 500
+
+# Print a progress line after this many ingested documents
+PROGRESS_INTERVAL = 50
+
+_worker_app = None
+
+
+def _is_archive(path):
+    return os.path.isfile(path) and (zipfile.is_zipfile(path) or tarfile.is_tarfile(path))
+
+def _staging_dir(user, source):
+    """
+    Return a stable working directory for a user's import, so a resumed run finds its previous state
+    """
+    key = hashlib.sha256(f'{user.id}:{os.path.abspath(source)}'.encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'imports', key)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _extract_archive(archive_path, target_dir):
+    """
+    Unpack an archive once; a marker file lets resumed runs skip the extraction
+    """
+    marker = os.path.join(target_dir, '.extracted')
+    if os.path.exists(marker):
+        return
+
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            archive.extractall(target_dir)
+    else:
+        with tarfile.open(archive_path) as archive:
+            archive.extractall(target_dir, filter='data')
+
+    open(marker, 'w').close()
+
+def _iter_files(root):
+    """
+    Yield (relative path, absolute path) for every supported file under root, in a stable order
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for name in sorted(filenames):
+            if name.startswith('.') or not is_supported(name):
+                continue
+            path = os.path.join(dirpath, name)
+            yield os.path.relpath(path, root), path
+
+
+class Checkpoint:
+    """
+    Append-only JSON-lines log of import progress, keyed by path relative to the import root.
+
+    Every entry records the importing user, and entries of other users are
+    ignored, so a checkpoint file can never make one user's import skip or
+    reuse another user's documents.
+    """
+
+    def __init__(self, path, user_id):
+        self.path = path
+        self.user_id = user_id
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A run killed mid-write can leave a torn last line
+                        continue
+                    if entry.get('user_id') == user_id:
+                        self.entries.setdefault(entry['path'], {}).update(entry)
+        self._file = open(path, 'a')
+
+    def record(self, path, **fields):
+        entry = dict(fields, path=path, user_id=self.user_id)
+        self.entries.setdefault(path, {}).update(entry)
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _init_worker():
+    global _worker_app
+    from studyai_web_deployment.app import create_app
+    _worker_app = create_app()
+    _worker_app.app_context().push()
+
+def _ingest(document_id):
+    """
+    Build the vector index for one document inside a worker process
+    """
+    from studyai_web_deployment.app.utils.document_processor import fail_processing, process_document
+
+    start = time.perf_counter()
+    try:
+        # Restart the stale-processing clock, since the document may have waited in the queue for a while
+        Document.query.filter_by(id=document_id).update(
+            {'status': 'processing', 'processing_started_at': datetime.utcnow()}
+        )
+        db.session.commit()
+        document = db.session.get(Document, document_id)
+        process_document(document)
+        return document_id, None, time.perf_counter() - start
+    except Exception as e:
+        fail_processing(document_id, e)
+        return document_id, str(e), time.perf_counter() - start
+    finally:
+        db.session.remove()
+
+def _find_created_document(user, path, filename, title):
+    """
+    Return the Document an interrupted run committed for a file, or None if it never did
+    """
+    return Document.query.filter_by(
+        user_id=user.id, blob_sha256=file_checksum(path), filename=filename, title=title
+    ).first()
+
+def _create_documents(user, pending, checkpoint, title_prefix, echo):
+    """
+    Store the pending files and create their Document rows, committing in batches.
+
+    Each batch is marked as being created in the checkpoint before it is
+    committed. A run killed between the commit and the checkpoint update
+    leaves those files marked, and the next run adopts the documents it
+    finds for them instead of creating and referencing them a second time.
+    """
+    created = 0
+    for start in range(0, len(pending), CREATE_BATCH_SIZE):
+        batch = pending[start:start + CREATE_BATCH_SIZE]
+        documents = []
+        for rel_path, path in batch:
+            filename = (secure_filename(os.path.basename(rel_path)) or 'document')[:100]
+            title = f'{title_prefix}{os.path.splitext(rel_path)[0]}'[:100]
+
+            document = None
+            if checkpoint.entries.get(rel_path, {}).get('status') == 'creating':
+                document = _find_created_document(user, path, filename, title)
+            if document is None:
+                blob = store_file(path, move=False)
+                document = Document(
+                    title=title,
+                    filename=filename,
+                    file_path=blob.path,
+                    content_type=mimetypes.guess_type(filename)[0],
+                    blob_sha256=blob.sha256,
+                    status='processing',
+                    processing_started_at=datetime.utcnow(),
+                    user_id=user.id
+                )
+                db.session.add(document)
+            documents.append((rel_path, document))
+
+        for rel_path, _ in documents:
+            checkpoint.record(rel_path, status='creating')
+        db.session.commit()
+
+        for rel_path, document in documents:
+            checkpoint.record(rel_path, document_id=document.id, status='created')
+        created += len(documents)
+        echo(f'Created {created}/{len(pending)} documents')
+    return created
+
+def import_course(user, source, workers=None, checkpoint_path=None, title_prefix='', retry_failed=False, echo=print):
+    """
+    Import every supported file in a directory or archive as documents of `user`.
+
+    Files are copied into the blob store and their Document rows created in
+    batches, then indexed by a pool of worker processes. Progress goes to a
+    checkpoint file, so running the same import again skips finished files
+    and resumes the rest. Returns a dict of run statistics.
+    """
+    start = time.perf_counter()
+    staging = _staging_dir(user, source)
+    checkpoint = Checkpoint(checkpoint_path or os.path.join(staging, 'checkpoint.jsonl'), user.id)
+
+    try:
+        if _is_archive(source):
+            root = os.path.join(staging, 'files')
+            _extract_archive(source, root)
+        elif os.path.isdir(source):
+            root = source
+        else:
+            raise ValueError(f'{source} is neither a directory nor a zip or tar archive')
+
+        files = list(_iter_files(root))
+        pending = [
+            (rel_path, path) for rel_path, path in files
+            if checkpoint.entries.get(rel_path, {}).get('status') in (None, 'creating')
+        ]
+        echo(f'Found {len(files)} supported files, {len(files) - len(pending)} already imported')
+
+        created = _create_documents(user, pending, checkpoint, title_prefix, echo)
+
+        resumable = {'created', 'failed'} if retry_failed else {'created'}
+        to_ingest = {
+            entry['document_id']: rel_path
+            for rel_path, entry in checkpoint.entries.items()
+            if entry.get('status') in resumable
+        }
+        ingest_paths = set(to_ingest.values())
+        total_bytes = sum(os.path.getsize(path) for rel_path, path in files if rel_path in ingest_paths)
+
+        # Spawn rather than fork so workers do not share the parent's database connections
+        ingest_start = time.perf_counter()
+        done = failed = 0
+        workers = workers or os.cpu_count() or 1
+        if to_ingest:
+            echo(f'Ingesting {len(to_ingest)} documents with {workers} workers')
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as executor:
+                futures = [executor.submit(_ingest, document_id) for document_id in to_ingest]
+                for future in as_completed(futures):
+                    document_id, error, _ = future.result()
+                    rel_path = to_ingest[document_id]
+                    if error:
+                        failed += 1
+                        checkpoint.record(rel_path, document_id=document_id, status='failed', error=error)
+                        echo(f'Failed {rel_path}: {error}')
+                    else:
+                        done += 1
+                        checkpoint.record(rel_path, document_id=document_id, status='done')
+
+                    processed = done + failed
+                    if processed % PROGRESS_INTERVAL == 0:
+                        elapsed = time.perf_counter() - ingest_start
+                        echo(f'Ingested {processed}/{len(to_ingest)} ({processed / elapsed:.1f} files/s)')
+    finally:
+        checkpoint.close()
+
+    ingest_elapsed = time.perf_counter() - ingest_start
+    return {
+        'files': len(files),
+        'created': created,
+        'ingested': done,
+        'failed': failed,
+        'bytes': total_bytes,
+        'elapsed': time.perf_counter() - start,
+        'ingest_elapsed': ingest_elapsed,
+        'files_per_second': done / ingest_elapsed if ingest_elapsed else 0.0,
+        'bytes_per_second': total_bytes / ingest_elapsed if ingest_elapsed else 0.0,
+        'checkpoint': checkpoint.path,
+    }
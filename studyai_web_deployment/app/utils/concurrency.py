@@ -0,0 +1,44 @@
+import os
+import threading
+
+# Upper bound on model and embedding calls running at once in a worker
+MODEL_CONCURRENCY = int(os.environ.get('MODEL_CONCURRENCY', 8))
+
+_model_slots = threading.BoundedSemaphore(MODEL_CONCURRENCY)
+_threadpool = None
+
+
+def _gevent_active():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+def _get_threadpool():
+    """
+    Return gevent's native thread pool, sized to the model concurrency limit
+    """
+    global _threadpool
+    if _threadpool is None:
+        import gevent
+        _threadpool = gevent.get_hub().threadpool
+        _threadpool.maxsize = MODEL_CONCURRENCY
+    return _threadpool
+
+def run_blocking(func, *args, **kwargs):
+    """
+    Run a model or embedding call under the per-worker concurrency limit.
+
+    Under gevent workers the call is handed to a real OS thread, so neither
+    CPU-bound work (embedding, FAISS search) nor the wait on the remote model
+    stalls the event loop, and the worker keeps serving other requests.
+    Under sync workers it runs inline.
+
+    Only pass plain values, never ORM objects: the call may run on another
+    thread than the request's database session.
+    """
+    with _model_slots:
+        if _gevent_active():
+            return _get_threadpool().spawn(func, *args, **kwargs).get()
+        return func(*args, **kwargs)
@@ -1,66 +1,152 @@
 import os
-import json
+from datetime import datetime, timedelta
 from sentence_transformers import SentenceTransformer
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.document_loaders import PyPDFLoader, TextLoader
+from langchain.docstore.document import Document as TextDocument
 from langchain.vectorstores import FAISS
 from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.chains.question_answering import load_qa_chain
 from langchain.llms import HuggingFaceHub
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from studyai_web_deployment.app import db
+from studyai_web_deployment.app.models.models import Document
+from studyai_web_deployment.app.utils.concurrency import run_blocking
+from studyai_web_deployment.app.utils.extractors import extract_sections
+from studyai_web_deployment.app.utils.output_parser import generate_items, FLASHCARD_SCHEMA, QUIZ_SCHEMA
+from studyai_web_deployment.app.utils.storage import document_data_dir
 
 # Initialize embedding model
 embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
 
-def process_document(document):
+# Number of chunks embedded and added to the index at a time during ingestion
+EMBEDDING_BATCH_SIZE = 256
+
+# Documents ingested at once in the background by each worker process
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 2))
+
+# Documents still processing after this long were interrupted and are marked as failed
+STALE_PROCESSING_AGE = timedelta(hours=2)
+
+_ingest_executor = None
+
+def _build_index(file_path, filename, content_type, doc_data_dir):
     """
-    Process a document and create a vector store for it
+    Extract, split and embed a file into a vector store saved under doc_data_dir.
+    Returns the size of the saved index in bytes.
     """
-    # Create a directory for this document's data if it doesn't exist
-    doc_data_dir = os.path.join('app', 'data', str(document.user_id), str(document.id))
     os.makedirs(doc_data_dir, exist_ok=True)
     
-    # Load document based on file type
-    file_path = document.file_path
-    file_extension = os.path.splitext(file_path)[1].lower()
-    
-    if file_extension == '.pdf':
-        loader = PyPDFLoader(file_path)
-    elif file_extension in ['.txt', '.md']:
-        loader = TextLoader(file_path)
-    else:
-        raise ValueError(f"Unsupported file type: {file_extension}")
-    
-    documents = loader.load()
-    
-    # Split documents into chunks
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=200
     )
-    chunks = text_splitter.split_documents(documents)
     
-    # Create vector store
-    vectorstore = FAISS.from_documents(chunks, embeddings)
+    # Stream the document section by section, embedding chunks in fixed-size
+    # batches so memory stays bounded regardless of the file size
+    vectorstore = None
+    batch = []
+    for text, metadata in extract_sections(file_path, filename, content_type):
+        batch.extend(text_splitter.split_documents([TextDocument(page_content=text, metadata=metadata)]))
+        if len(batch) >= EMBEDDING_BATCH_SIZE:
+            vectorstore = _add_to_index(vectorstore, batch)
+            batch = []
+    
+    if batch:
+        vectorstore = _add_to_index(vectorstore, batch)
+    
+    if vectorstore is None:
+        raise ValueError("No text could be extracted from this document")
     
-    # Save vector store
     vectorstore.save_local(doc_data_dir)
+    return sum(os.path.getsize(os.path.join(doc_data_dir, name)) for name in os.listdir(doc_data_dir))
+
+def process_document(document):
+    """
+    Process a document and create a vector store for it
+    """
+    # Parsing and splitting are CPU-bound like the embedding itself, so the whole
+    # build runs off the event loop instead of stalling every request on the worker
+    document.index_size = run_blocking(
+        _build_index, document.file_path, document.filename, document.content_type, document_data_dir(document)
+    )
+    document.status = 'ready'
+    document.processing_error = None
+    db.session.commit()
     
     return True
 
+def fail_processing(document_id, error):
+    """
+    Record that ingesting a document failed, discarding whatever the session held
+    """
+    db.session.rollback()
+    Document.query.filter_by(id=document_id).update({'status': 'failed', 'processing_error': str(error)})
+    db.session.commit()
+
+def fail_stale_processing(now=None):
+    """
+    Mark documents whose ingestion was interrupted, e.g. by a worker restart, as failed.
+    Returns the number of documents marked.
+    """
+    cutoff = (now or datetime.utcnow()) - STALE_PROCESSING_AGE
+    count = Document.query.filter(
+        Document.status == 'processing', Document.processing_started_at < cutoff
+    ).update({'status': 'failed', 'processing_error': 'Processing was interrupted, please retry'})
+    db.session.commit()
+    return count
+
+def _process_in_background(app, document_id):
+    with app.app_context():
+        document = db.session.get(Document, document_id)
+        if document is None:
+            # Deleted before ingestion started
+            return
+        try:
+            process_document(document)
+        except Exception as e:
+            fail_processing(document_id, e)
+
+def start_processing(document):
+    """
+    Ingest a committed document on a background thread and return immediately.
+
+    The document is marked as processing and its ingestion sets it to ready
+    or failed, so clients poll its status instead of holding the request open
+    for the whole ingestion.
+    """
+    global _ingest_executor
+    if _ingest_executor is None:
+        _ingest_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix='ingest')
+
+    document.status = 'processing'
+    document.processing_error = None
+    document.processing_started_at = datetime.utcnow()
+    db.session.commit()
+    _ingest_executor.submit(_process_in_background, current_app._get_current_object(), document.id)
+
+def _add_to_index(vectorstore, chunks):
+    if vectorstore is None:
+        return FAISS.from_documents(chunks, embeddings)
+    vectorstore.add_documents(chunks)
+    return vectorstore
+
+def _retrieve(doc_data_dir, query_text, k):
+    """
+    Load a document's vector store and return the chunks most relevant to the query
+    """
+    vectorstore = FAISS.load_local(doc_data_dir, embeddings)
+    retriever = vectorstore.as_retriever(search_kwargs={"k": k})
+    return retriever.get_relevant_documents(query_text)
+
 def query_document(document, query_text):
     """
     Query the document with a specific question
     """
-    # Load the vector store
-    doc_data_dir = os.path.join('app', 'data', str(document.user_id), str(document.id))
-    vectorstore = FAISS.load_local(doc_data_dir, embeddings)
-    
-    # Create a retriever
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
-    
-    # Get relevant documents
-    docs = retriever.get_relevant_documents(query_text)
+    # Get relevant documents from the vector store
+    doc_data_dir = document_data_dir(document)
+    docs = run_blocking(_retrieve, doc_data_dir, query_text, 3)
     
     # Use a simpler approach for generating responses
     context = "\n\n".join([doc.page_content for doc in docs])
@@ -75,23 +161,85 @@ def query_document(document, query_text):
     chain = load_qa_chain(llm, chain_type="stuff")
     
     # Run the chain
-    response = chain.run(input_documents=docs, question=query_text)
+    response = run_blocking(chain.run, input_documents=docs, question=query_text)
     
     return response
 
+FLASHCARD_COUNT = 5
+QUIZ_QUESTION_COUNT = 5
+
+def _fallback_flashcards(document):
+    """
+    Placeholder flashcards used only when the model produced nothing usable
+    """
+    return [
+        {"front": "What is this document about?", "back": "This document covers " + document.title},
+        {"front": "When was this document uploaded?", "back": str(document.uploaded_at)},
+        {"front": "Who created this document?", "back": "The document was uploaded by you"},
+        {"front": "What is the filename?", "back": document.filename},
+        {"front": "What is the purpose of StudyAI?", "back": "To help you study and learn from your documents"}
+    ]
+
+def _fallback_quiz(document):
+    """
+    Placeholder quiz used only when the model produced nothing usable
+    """
+    quiz = [
+        {
+            "question": f"What is the title of this document?",
+            "options": [document.title, "Unknown Document", "Study Guide", "Reference Material"],
+            "correct_answer": 0
+        },
+        {
+            "question": "What tool are you using to study this document?",
+            "options": ["Google Docs", "Microsoft Word", "StudyAI", "Adobe Reader"],
+            "correct_answer": 2
+        },
+        {
+            "question": "What can you create with StudyAI?",
+            "options": ["Videos", "Flashcards and Quizzes", "Presentations", "Spreadsheets"],
+            "correct_answer": 1
+        },
+        {
+            "question": "Where is your document stored?",
+            "options": ["On Google Drive", "In your StudyAI account", "On Dropbox", "It's not stored anywhere"],
+            "correct_answer": 1
+        },
+        {
+            "question": "What format is your document?",
+            "options": [".pdf", ".txt", ".docx", "The actual format of your document"],
+            "correct_answer": 3
+        }
+    ]
+    # Fix the last question to show the actual format
+    file_extension = os.path.splitext(document.filename)[1].lower()
+    quiz[4]["options"][3] = file_extension
+    if file_extension == ".pdf":
+        quiz[4]["correct_answer"] = 0
+    elif file_extension == ".txt":
+        quiz[4]["correct_answer"] = 1
+    elif file_extension == ".docx":
+        quiz[4]["correct_answer"] = 2
+    else:
+        quiz[4]["correct_answer"] = 3
+    return quiz
+
+def _avoid_clause(existing, field):
+    """
+    Prompt text asking the model not to repeat items it already produced
+    """
+    if not existing:
+        return ""
+    listed = "\n".join(f"- {item[field]}" for item in existing)
+    return f"Do not repeat any of these:\n{listed}\n"
+
 def generate_flashcards(document):
     """
     Generate flashcards for a document
     """
-    # Load the vector store
-    doc_data_dir = os.path.join('app', 'data', str(document.user_id), str(document.id))
-    vectorstore = FAISS.load_local(doc_data_dir, embeddings)
-    
-    # Create a retriever
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-    
     # Get a sample of documents to create flashcards from
-    docs = retriever.get_relevant_documents("important concepts")
+    doc_data_dir = document_data_dir(document)
+    docs = run_blocking(_retrieve, doc_data_dir, "important concepts", 5)
     
     # Use HuggingFace Hub for inference
     llm = HuggingFaceHub(
@@ -99,48 +247,24 @@ def generate_flashcards(document):
         model_kwargs={"temperature": 0.7, "max_length": 1024}
     )
     
-    # Create prompt for flashcard generation
     context = "\n\n".join([doc.page_content for doc in docs])
-    prompt = f"""
-    Based on the following text, generate 5 flashcards in JSON format.
-    Each flashcard should have a 'front' with a question or term and a 'back' with the answer or definition.
     
+    def build_prompt(missing, existing):
+        return f"""
+    Based on the following text, generate {missing} flashcards in JSON format.
+    Each flashcard should have a 'front' with a question or term and a 'back' with the answer or definition.
+    {_avoid_clause(existing, 'front')}
     Text:
     {context}
     
     Output only the JSON array with no other text.
     """
     
-    # Generate flashcards
-    response = llm(prompt)
+    # Keep every valid card from each response and only re-request the missing ones
+    flashcards = generate_items(lambda prompt: run_blocking(llm, prompt), build_prompt, FLASHCARD_SCHEMA, 'front', FLASHCARD_COUNT)
     
-    # Parse the response to extract the JSON
-    try:
-        # Try to find JSON in the response
-        start_idx = response.find('[')
-        end_idx = response.rfind(']') + 1
-        
-        if start_idx >= 0 and end_idx > start_idx:
-            json_str = response[start_idx:end_idx]
-            flashcards = json.loads(json_str)
-        else:
-            # Fallback: create some basic flashcards
-            flashcards = [
-                {"front": "What is this document about?", "back": "This document covers " + document.title},
-                {"front": "When was this document uploaded?", "back": str(document.uploaded_at)},
-                {"front": "Who created this document?", "back": "The document was uploaded by you"},
-                {"front": "What is the filename?", "back": document.filename},
-                {"front": "What is the purpose of StudyAI?", "back": "To help you study and learn from your documents"}
-            ]
-    except:
-        # Fallback: create some basic flashcards
-        flashcards = [
-            {"front": "What is this document about?", "back": "This document covers " + document.title},
-            {"front": "When was this document uploaded?", "back": str(document.uploaded_at)},
-            {"front": "Who created this document?", "back": "The document was uploaded by you"},
-            {"front": "What is the filename?", "back": document.filename},
-            {"front": "What is the purpose of StudyAI?", "back": "To help you study and learn from your documents"}
-        ]
+    if not flashcards:
+        flashcards = _fallback_flashcards(document)
     
     return flashcards
 
@@ -148,15 +272,9 @@ def generate_quiz(document):
     """
     Generate a quiz for a document
     """
-    # Load the vector store
-    doc_data_dir = os.path.join('app', 'data', str(document.user_id), str(document.id))
-    vectorstore = FAISS.load_local(doc_data_dir, embeddings)
-    
-    # Create a retriever
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-    
     # Get a sample of documents to create quiz from
-    docs = retriever.get_relevant_documents("important concepts test questions")
+    doc_data_dir = document_data_dir(document)
+    docs = run_blocking(_retrieve, doc_data_dir, "important concepts test questions", 5)
     
     # Use HuggingFace Hub for inference
     llm = HuggingFaceHub(
@@ -164,109 +282,23 @@ def generate_quiz(document):
         model_kwargs={"temperature": 0.7, "max_length": 1024}
     )
     
-    # Create prompt for quiz generation
     context = "\n\n".join([doc.page_content for doc in docs])
-    prompt = f"""
-    Based on the following text, generate 5 multiple-choice questions in JSON format.
-    Each question should have a 'question' field, an 'options' array with 4 choices, and a 'correct_answer' field with the index (0-3) of the correct option.
     
+    def build_prompt(missing, existing):
+        return f"""
+    Based on the following text, generate {missing} multiple-choice questions in JSON format.
+    Each question should have a 'question' field, an 'options' array with 4 choices, and a 'correct_answer' field with the index (0-3) of the correct option.
+    {_avoid_clause(existing, 'question')}
     Text:
     {context}
     
     Output only the JSON array with no other text.
     """
     
-    # Generate quiz
-    response = llm(prompt)
+    # Keep every valid question from each response and only re-request the missing ones
+    quiz = generate_items(lambda prompt: run_blocking(llm, prompt), build_prompt, QUIZ_SCHEMA, 'question', QUIZ_QUESTION_COUNT)
     
-    # Parse the response to extract the JSON
-    try:
-        # Try to find JSON in the response
-        start_idx = response.find('[')
-        end_idx = response.rfind(']') + 1
-        
-        if start_idx >= 0 and end_idx > start_idx:
-            json_str = response[start_idx:end_idx]
-            quiz = json.loads(json_str)
-        else:
-            # Fallback: create a basic quiz
-            quiz = [
-                {
-                    "question": f"What is the title of this document?",
-                    "options": [document.title, "Unknown Document", "Study Guide", "Reference Material"],
-                    "correct_answer": 0
-                },
-                {
-                    "question": "What tool are you using to study this document?",
-                    "options": ["Google Docs", "Microsoft Word", "StudyAI", "Adobe Reader"],
-                    "correct_answer": 2
-                },
-                {
-                    "question": "What can you create with StudyAI?",
-                    "options": ["Videos", "Flashcards and Quizzes", "Presentations", "Spreadsheets"],
-                    "correct_answer": 1
-                },
-                {
-                    "question": "Where is your document stored?",
-                    "options": ["On Google Drive", "In your StudyAI account", "On Dropbox", "It's not stored anywhere"],
-                    "correct_answer": 1
-                },
-                {
-                    "question": "What format is your document?",
-                    "options": [".pdf", ".txt", ".docx", "The actual format of your document"],
-                    "correct_answer": 3
-                }
-            ]
-            # Fix the last question to show the actual format
-            file_extension = os.path.splitext(document.filename)[1].lower()
-            quiz[4]["options"][3] = file_extension
-            if file_extension == ".pdf":
-                quiz[4]["correct_answer"] = 0
-            elif file_extension == ".txt":
-                quiz[4]["correct_answer"] = 1
-            elif file_extension == ".docx":
-                quiz[4]["correct_answer"] = 2
-            else:
-                quiz[4]["correct_answer"] = 3
-    except:
-        # Fallback: create a basic quiz
-        quiz = [
-            {
-                "question": f"What is the title of this document?",
-                "options": [document.title, "Unknown Document", "Study Guide", "Reference Material"],
-                "correct_answer": 0
-            },
-            {
-                "question": "What tool are you using to study this document?",
-                "options": ["Google Docs", "Microsoft Word", "StudyAI", "Adobe Reader"],
-                "correct_answer": 2
-            },
-            {
-                "question": "What can you create with StudyAI?",
-                "options": ["Videos", "Flashcards and Quizzes", "Presentations", "Spreadsheets"],
-                "correct_answer": 1
-            },
-            {
-                "question": "Where is your document stored?",
-                "options": ["On Google Drive", "In your StudyAI account", "On Dropbox", "It's not stored anywhere"],
-                "correct_answer": 1
-            },
-            {
-                "question": "What format is your document?",
-                "options": [".pdf", ".txt", ".docx", "The actual format of your document"],
-                "correct_answer": 3
-            }
-        ]
-        # Fix the last question to show the actual format
-        file_extension = os.path.splitext(document.filename)[1].lower()
-        quiz[4]["options"][3] = file_extension
-        if file_extension == ".pdf":
-            quiz[4]["correct_answer"] = 0
-        elif file_extension == ".txt":
-            quiz[4]["correct_answer"] = 1
-        elif file_extension == ".docx":
-            quiz[4]["correct_answer"] = 2
-        else:
-            quiz[4]["correct_answer"] = 3
+    if not quiz:
+        quiz = _fallback_quiz(document)
     
     return quiz
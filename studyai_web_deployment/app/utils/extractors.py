@@ -0,0 +1,280 @@
+import io
+import os
+import posixpath
+import re
+import zipfile
+from urllib.parse import unquote, urldefrag
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from pypdf import PdfReader
+
+# Extractors yield text in sections of roughly this many characters so that
+# ingestion never holds a whole document in memory
+SECTION_SIZE = 20000
+
+# Bytes read at a time when streaming plain text and HTML
+READ_BLOCK_SIZE = 64 * 1024
+
+_EXTRACTORS = []
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+DRAWING_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+
+class Extractor:
+    def __init__(self, name, func, extensions, mime_types):
+        self.name = name
+        self.func = func
+        self.extensions = extensions
+        self.mime_types = mime_types
+
+    def __call__(self, file_path):
+        return self.func(file_path)
+
+    def __repr__(self):
+        return f'<Extractor {self.name}>'
+
+def register_extractor(name, extensions=(), mime_types=()):
+    """
+    Register a text extractor for the given file extensions and MIME types.
+
+    The decorated function takes a file path and yields (text, metadata)
+    tuples, one per page or section.
+    """
+    def decorator(func):
+        _EXTRACTORS.append(Extractor(
+            name,
+            func,
+            tuple(ext.lower() for ext in extensions),
+            tuple(mime.lower() for mime in mime_types)
+        ))
+        return func
+    return decorator
+
+def _by_extension(extension):
+    for extractor in _EXTRACTORS:
+        if extension in extractor.extensions:
+            return extractor
+    return None
+
+def _by_mime_type(mime_type):
+    mime_type = (mime_type or '').split(';')[0].strip().lower()
+    for extractor in _EXTRACTORS:
+        if mime_type in extractor.mime_types:
+            return extractor
+    return None
+
+def sniff_mime_type(file_path):
+    """
+    Guess a file's MIME type from its leading bytes and, for zip containers, their contents
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(2048)
+
+    if head.startswith(b'%PDF'):
+        return 'application/pdf'
+    if head.startswith(b'PK'):
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                names = set(archive.namelist())
+                if 'mimetype' in names and archive.read('mimetype').strip() == b'application/epub+zip':
+                    return 'application/epub+zip'
+        except zipfile.BadZipFile:
+            return None
+        if 'word/document.xml' in names:
+            return 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        if any(name.startswith('ppt/slides/') for name in names):
+            return 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+        return None
+
+    lowered = head.lstrip().lower()
+    if lowered.startswith(b'<!doctype html') or lowered.startswith(b'<html'):
+        return 'text/html'
+    if b'\x00' not in head:
+        return 'text/plain'
+    return None
+
+def is_supported(filename):
+    """
+    Return whether a file can be ingested based on its extension alone
+    """
+    return _by_extension(os.path.splitext(filename)[1].lower()) is not None
+
+def get_extractor(file_path, filename=None, content_type=None):
+    """
+    Pick the extractor for a file by extension, then declared MIME type, then sniffed MIME type
+    """
+    extension = os.path.splitext(filename or file_path)[1].lower()
+    extractor = _by_extension(extension) or _by_mime_type(content_type)
+    if extractor is None:
+        extractor = _by_mime_type(sniff_mime_type(file_path))
+    if extractor is None:
+        raise ValueError(f"Unsupported file type: {extension or content_type}")
+    return extractor
+
+def extract_sections(file_path, filename=None, content_type=None):
+    """
+    Stream (text, metadata) sections out of a file using the matching extractor
+    """
+    extractor = get_extractor(file_path, filename, content_type)
+    source = filename or os.path.basename(file_path)
+    for text, metadata in extractor(file_path):
+        if text.strip():
+            yield text, dict(metadata, source=source)
+
+def _split_sections(pieces, metadata=None):
+    """
+    Group an iterable of text pieces into sections of about SECTION_SIZE characters
+    """
+    buffer = []
+    size = 0
+    section = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= SECTION_SIZE:
+            yield ''.join(buffer), dict(metadata or {}, section=section)
+            section += 1
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer), dict(metadata or {}, section=section)
+
+
+class _HTMLTextParser(HTMLParser):
+    SKIP_TAGS = {'script', 'style', 'head', 'noscript', 'template'}
+    BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'section', 'article',
+                  'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pieces = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.pieces.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self.BLOCK_TAGS:
+            self.pieces.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.pieces.append(data)
+
+    def drain(self):
+        pieces = self.pieces
+        self.pieces = []
+        return pieces
+
+def _iter_html_text(stream):
+    """
+    Feed a text stream through the HTML parser block by block, yielding visible text
+    """
+    parser = _HTMLTextParser()
+    for block in _iter_blocks(stream):
+        parser.feed(block)
+        yield from parser.drain()
+    parser.close()
+    yield from parser.drain()
+
+def _iter_blocks(stream):
+    return iter(lambda: stream.read(READ_BLOCK_SIZE), '')
+
+def _open_text(file_path):
+    return open(file_path, 'r', encoding='utf-8', errors='replace')
+
+
+@register_extractor('pdf', extensions=['.pdf'], mime_types=['application/pdf'])
+def extract_pdf(file_path):
+    reader = PdfReader(file_path)
+    for page_number, page in enumerate(reader.pages):
+        yield page.extract_text() or '', {'page': page_number}
+
+@register_extractor('text', extensions=['.txt', '.md'], mime_types=['text/plain', 'text/markdown'])
+def extract_text(file_path):
+    # Read fixed-size blocks rather than lines, which can be arbitrarily long
+    with _open_text(file_path) as f:
+        yield from _split_sections(_iter_blocks(f))
+
+@register_extractor('html', extensions=['.html', '.htm', '.xhtml'], mime_types=['text/html', 'application/xhtml+xml'])
+def extract_html(file_path):
+    with _open_text(file_path) as f:
+        yield from _split_sections(_iter_html_text(f))
+
+def _iter_docx_paragraphs(archive):
+    with archive.open('word/document.xml') as f:
+        for event, elem in ET.iterparse(f, events=('end',)):
+            if elem.tag == WORD_NS + 'p':
+                text = ''.join(node.text or '' for node in elem.iter(WORD_NS + 't'))
+                # Free parsed paragraphs as we go so large documents stay bounded
+                elem.clear()
+                if text:
+                    yield text + '\n'
+
+@register_extractor('docx', extensions=['.docx'], mime_types=['application/vnd.openxmlformats-officedocument.wordprocessingml.document'])
+def extract_docx(file_path):
+    with zipfile.ZipFile(file_path) as archive:
+        yield from _split_sections(_iter_docx_paragraphs(archive))
+
+def _slide_number(name):
+    match = re.search(r'slide(\d+)\.xml$', name)
+    return int(match.group(1)) if match else 0
+
+@register_extractor('pptx', extensions=['.pptx'], mime_types=['application/vnd.openxmlformats-officedocument.presentationml.presentation'])
+def extract_pptx(file_path):
+    with zipfile.ZipFile(file_path) as archive:
+        slides = sorted(
+            (name for name in archive.namelist() if re.match(r'ppt/slides/slide\d+\.xml$', name)),
+            key=_slide_number
+        )
+        for name in slides:
+            with archive.open(name) as f:
+                root = ET.parse(f).getroot()
+            paragraphs = []
+            for paragraph in root.iter(DRAWING_NS + 'p'):
+                text = ''.join(node.text or '' for node in paragraph.iter(DRAWING_NS + 't'))
+                if text:
+                    paragraphs.append(text)
+            yield '\n'.join(paragraphs), {'slide': _slide_number(name)}
+
+def _epub_spine(archive):
+    """
+    Return the archive paths of an EPUB's content documents in reading order
+    """
+    container = ET.fromstring(archive.read('META-INF/container.xml'))
+    rootfile = next(elem for elem in container.iter() if elem.tag.endswith('rootfile'))
+    opf_path = rootfile.get('full-path')
+    opf_dir = posixpath.dirname(opf_path)
+
+    package = ET.fromstring(archive.read(opf_path))
+    manifest = {}
+    spine = []
+    for elem in package.iter():
+        if elem.tag.endswith('}item'):
+            manifest[elem.get('id')] = elem.get('href')
+        elif elem.tag.endswith('}itemref'):
+            spine.append(elem.get('idref'))
+
+    # Manifest hrefs are URIs: drop any fragment and decode escapes such as %20
+    return [
+        posixpath.normpath(posixpath.join(opf_dir, unquote(urldefrag(manifest[idref])[0])))
+        for idref in spine if idref in manifest
+    ]
+
+@register_extractor('epub', extensions=['.epub'], mime_types=['application/epub+zip'])
+def extract_epub(file_path):
+    with zipfile.ZipFile(file_path) as archive:
+        names = set(archive.namelist())
+        for chapter, name in enumerate(_epub_spine(archive)):
+            if name not in names:
+                # A broken spine entry should not cost the rest of the book
+                continue
+            with archive.open(name) as raw:
+                stream = io.TextIOWrapper(raw, encoding='utf-8', errors='replace')
+                yield from _split_sections(_iter_html_text(stream), {'chapter': chapter})
@@ -0,0 +1,107 @@
+import hashlib
+import os
+import sqlite3
+import time
+from flask import current_app, request, session, make_response
+
+# Bump to invalidate every cached page, e.g. after template changes
+CACHE_FORMAT_VERSION = 2
+
+
+class FragmentCache:
+    """
+    Rendered HTML cache stored in a SQLite file so every gunicorn worker shares it.
+
+    Entries are grouped by scope (a view and the object it renders); storing a
+    new entry drops the scope's older versions, so stale pages never linger.
+    """
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS fragments ('
+                'key TEXT PRIMARY KEY, scope TEXT NOT NULL, body TEXT NOT NULL, stored_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_fragments_scope ON fragments (scope)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_fragments_stored_at ON fragments (stored_at)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute('SELECT body FROM fragments WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, scope, key, body):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM fragments WHERE scope = ? AND key != ?', (scope, key))
+            conn.execute(
+                'INSERT OR REPLACE INTO fragments (key, scope, body, stored_at) VALUES (?, ?, ?, ?)',
+                (key, scope, body, time.time())
+            )
+            # Evict the oldest entries once the cache grows past its limit
+            conn.execute(
+                'DELETE FROM fragments WHERE key IN ('
+                'SELECT key FROM fragments ORDER BY stored_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM fragments')
+
+
+def init_fragment_cache(app):
+    app.extensions['fragment_cache'] = FragmentCache(
+        app.config['FRAGMENT_CACHE_PATH'],
+        app.config['FRAGMENT_CACHE_MAX_ENTRIES']
+    )
+
+class CachedPage:
+    """
+    A cacheable page identified by its scope and a content version
+    """
+
+    def __init__(self, scope, version):
+        self.scope = scope
+        self.key = f'{CACHE_FORMAT_VERSION}:{scope}:{version}'
+        self.etag = hashlib.sha256(self.key.encode('utf-8')).hexdigest()[:32]
+        # Pages carrying one-off flash messages must never be cached or revalidated.
+        # Checked up front because rendering the page consumes the messages.
+        self.cacheable = not session.get('_flashes')
+
+    def _response(self, body, status=200):
+        response = make_response(body, status)
+        response.set_etag(self.etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def cached_response(self):
+        """
+        Return a 304 or a cached page for this version, or None if it must be rendered
+        """
+        if not self.cacheable:
+            return None
+
+        if request.if_none_match.contains(self.etag):
+            return self._response('', 304)
+
+        body = current_app.extensions['fragment_cache'].get(self.key)
+        if body is None:
+            return None
+        return self._response(body)
+
+    def store(self, body):
+        """
+        Cache a freshly rendered page and return it as a response
+        """
+        if not self.cacheable:
+            return make_response(body)
+
+        current_app.extensions['fragment_cache'].set(self.scope, self.key, body)
+        return self._response(body)
@@ -0,0 +1,169 @@
+import ast
+import json
+
+# How many times to go back to the model for items that are still missing
+MAX_GENERATION_ATTEMPTS = 3
+
+
+def _text(value, item):
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    return value or None
+
+def _options(value, item):
+    if not isinstance(value, (list, tuple)) or len(value) < 2:
+        return None
+    options = [str(option).strip() for option in value]
+    if any(not option for option in options):
+        return None
+    return options
+
+def _answer_index(value, item):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value.strip())
+    if not isinstance(value, int):
+        return None
+    options = item.get('options')
+    if not isinstance(options, (list, tuple)) or not 0 <= value < len(options):
+        return None
+    return value
+
+# Fields each generated item must carry, mapped to the validator that normalizes them
+FLASHCARD_SCHEMA = {
+    'front': _text,
+    'back': _text,
+}
+
+QUIZ_SCHEMA = {
+    'question': _text,
+    'options': _options,
+    'correct_answer': _answer_index,
+}
+
+
+def _find_object_end(text, start):
+    """
+    Return the index just past the object opening at text[start], or -1 if it is truncated
+    """
+    depth = 0
+    quote = None
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in ('"', "'"):
+            quote = char
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return -1
+
+def _load_object(fragment):
+    try:
+        return json.loads(fragment)
+    except ValueError:
+        pass
+    # Models often answer with Python-style literals (single quotes, True/False).
+    # literal_eval raises more than syntax errors on junk, e.g. TypeError for an
+    # unhashable key or RecursionError for deep nesting; none of it should abort parsing.
+    try:
+        return ast.literal_eval(fragment)
+    except Exception:
+        return None
+
+def iter_json_objects(text):
+    """
+    Yield every outermost JSON object that can be recovered from the text.
+    Malformed or unterminated objects are skipped by rescanning from the next
+    brace inside them, so the valid items of a partial, cut-off or wrapped
+    array are still returned.
+    """
+    pos = text.find('{')
+    while pos >= 0:
+        end = _find_object_end(text, pos)
+        obj = _load_object(text[pos:end]) if end >= 0 else None
+        if isinstance(obj, dict):
+            yield obj
+            pos = text.find('{', end)
+        else:
+            # Unterminated or unparsable; a complete object may still start inside it
+            pos = text.find('{', pos + 1)
+
+def validate_item(item, schema):
+    """
+    Validate a parsed item against a schema, returning a normalized copy or None
+    """
+    if not isinstance(item, dict):
+        return None
+    normalized = {}
+    for field, validator in schema.items():
+        if field not in item:
+            return None
+        value = validator(item[field], item)
+        if value is None:
+            return None
+        normalized[field] = value
+    return normalized
+
+def _iter_candidates(obj, schema):
+    """
+    Yield the valid items in a parsed object, looking inside wrappers such as {"flashcards": [...]}
+    """
+    item = validate_item(obj, schema)
+    if item is not None:
+        yield item
+        return
+    values = obj.values() if isinstance(obj, dict) else obj
+    for value in values:
+        if isinstance(value, (dict, list)):
+            yield from _iter_candidates(value, schema)
+
+def parse_items(text, schema, key_field):
+    """
+    Extract the valid, de-duplicated items described by the schema from model output
+    """
+    items = []
+    seen = set()
+    for obj in iter_json_objects(text or ''):
+        for item in _iter_candidates(obj, schema):
+            key = item[key_field].lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            items.append(item)
+    return items
+
+def generate_items(llm, build_prompt, schema, key_field, count, max_attempts=MAX_GENERATION_ATTEMPTS):
+    """
+    Ask the model for `count` items, keeping every valid item from each response
+    and only re-requesting the ones still missing.
+
+    `build_prompt(missing, existing)` returns the prompt asking for `missing`
+    more items that differ from the `existing` ones.
+    """
+    items = []
+    seen = set()
+    for _ in range(max_attempts):
+        missing = count - len(items)
+        if missing <= 0:
+            break
+        response = llm(build_prompt(missing, items))
+        for item in parse_items(response, schema, key_field):
+            key = item[key_field].lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            items.append(item)
+    return items[:count]
@@ -0,0 +1,104 @@
+from datetime import datetime
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
+from studyai_web_deployment.app import db
+from studyai_web_deployment.app.models.models import QuizAttempt, QuizAnswer, UserDocumentStats, UserQuestionStats
+
+
+def record_attempt(user_id, quiz, answers, now=None):
+    """
+    Persist a scored quiz attempt and fold it into the user's running aggregates.
+
+    `answers` is a list of (question_id, option_id, is_correct) tuples, with
+    option_id None for unanswered questions. The answers go in as one bulk
+    insert and each aggregate row is updated in place, so progress pages never
+    have to rescan attempt history. Aggregates are incremented in SQL, so
+    concurrent submissions by the same user all count.
+    """
+    now = now or datetime.utcnow()
+    total = len(answers)
+    score = sum(1 for _, _, is_correct in answers if is_correct)
+    percentage = round(score / total * 100) if total else 0
+
+    attempt = QuizAttempt(score=score, total=total, created_at=now, user_id=user_id, quiz_id=quiz.id)
+    db.session.add(attempt)
+    db.session.flush()  # Get the attempt ID
+
+    db.session.bulk_insert_mappings(QuizAnswer, [
+        {'attempt_id': attempt.id, 'question_id': question_id, 'option_id': option_id, 'is_correct': is_correct}
+        for question_id, option_id, is_correct in answers
+    ])
+
+    _update_document_stats(user_id, quiz.document_id, score, total, percentage, now)
+    _update_question_stats(user_id, answers, now)
+
+    db.session.commit()
+    return attempt
+
+def _insert_or_update(model, values, update):
+    """
+    Insert a new aggregate row, or apply `update` if a concurrent request created it first
+    """
+    try:
+        with db.session.begin_nested():
+            db.session.add(model(**values))
+    except IntegrityError:
+        update()
+
+def _update_document_stats(user_id, document_id, score, total, percentage, now):
+    # Increment in SQL so concurrent submissions (two tabs, a double click) never lose updates
+    def update():
+        return UserDocumentStats.query.filter_by(user_id=user_id, document_id=document_id).update({
+            'attempts': UserDocumentStats.attempts + 1,
+            'questions_answered': UserDocumentStats.questions_answered + total,
+            'correct_answers': UserDocumentStats.correct_answers + score,
+            'best_percentage': case(
+                (UserDocumentStats.best_percentage < percentage, percentage),
+                else_=UserDocumentStats.best_percentage
+            ),
+            'last_percentage': percentage,
+            'last_attempt_at': now,
+        }, synchronize_session=False)
+
+    if not update():
+        _insert_or_update(UserDocumentStats, {
+            'user_id': user_id, 'document_id': document_id, 'attempts': 1, 'questions_answered': total,
+            'correct_answers': score, 'best_percentage': percentage, 'last_percentage': percentage,
+            'last_attempt_at': now,
+        }, update)
+
+def _update_question_stats(user_id, answers, now):
+    def update(question_id, is_correct):
+        return UserQuestionStats.query.filter_by(user_id=user_id, question_id=question_id).update({
+            'attempts': UserQuestionStats.attempts + 1,
+            'correct_answers': UserQuestionStats.correct_answers + (1 if is_correct else 0),
+            'last_correct': is_correct,
+            'last_seen_at': now,
+        }, synchronize_session=False)
+
+    for question_id, _, is_correct in answers:
+        if not update(question_id, is_correct):
+            _insert_or_update(UserQuestionStats, {
+                'user_id': user_id, 'question_id': question_id, 'attempts': 1,
+                'correct_answers': 1 if is_correct else 0, 'last_correct': is_correct, 'last_seen_at': now,
+            }, lambda question_id=question_id, is_correct=is_correct: update(question_id, is_correct))
+
+def document_progress(user_id):
+    """
+    Return the user's per-document aggregates, most recently practised first
+    """
+    return UserDocumentStats.query.filter_by(user_id=user_id).order_by(
+        UserDocumentStats.last_attempt_at.desc()
+    ).all()
+
+def weakest_questions(user_id, limit=10):
+    """
+    Return the questions the user most often gets wrong
+    """
+    return UserQuestionStats.query.filter(
+        UserQuestionStats.user_id == user_id,
+        UserQuestionStats.correct_answers < UserQuestionStats.attempts
+    ).order_by(
+        (UserQuestionStats.correct_answers * 1.0 / UserQuestionStats.attempts).asc(),
+        UserQuestionStats.last_seen_at.desc()
+    ).limit(limit).all()
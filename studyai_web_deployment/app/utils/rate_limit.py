@@ -0,0 +1,136 @@
+import math
+import threading
+import time
+from functools import wraps
+from flask import current_app, jsonify, request
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+from studyai_web_deployment.app import db
+from studyai_web_deployment.app.models.models import RateLimitBucket
+
+# Attempts at the optimistic bucket update before giving up under contention
+MAX_BUCKET_RETRIES = 5
+
+_admission_lock = threading.Lock()
+_admission_slots = None
+_admission_waiting = 0
+
+
+def too_many_requests(message, retry_after):
+    retry_after = max(1, int(math.ceil(retry_after)))
+    response = jsonify({'error': message, 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def take_token(user_id, endpoint, limit, period, now=None):
+    """
+    Take one token from the user's bucket for an endpoint.
+
+    Buckets hold up to `limit` tokens and refill at `limit / period` tokens
+    per second. They live in the database so every worker sees the same
+    state; updates are compare-and-set on the refill time, so concurrent
+    requests cannot spend the same token twice.
+
+    Returns 0 if the request may proceed, otherwise the seconds until a token is available.
+    """
+    rate = limit / period
+    for _ in range(MAX_BUCKET_RETRIES):
+        current = now or time.time()
+        bucket = RateLimitBucket.query.filter_by(user_id=user_id, endpoint=endpoint).first()
+
+        if bucket is None:
+            db.session.add(RateLimitBucket(user_id=user_id, endpoint=endpoint, tokens=limit - 1, updated_at=current))
+            try:
+                db.session.commit()
+                return 0
+            except IntegrityError:
+                # Another worker created the bucket first; retry against its row
+                db.session.rollback()
+                continue
+
+        tokens = min(limit, bucket.tokens + (current - bucket.updated_at) * rate)
+        if tokens < 1:
+            return (1 - tokens) / rate
+
+        updated = RateLimitBucket.query.filter_by(id=bucket.id, updated_at=bucket.updated_at).update(
+            {'tokens': tokens - 1, 'updated_at': current}
+        )
+        db.session.commit()
+        if updated:
+            return 0
+
+    # Heavily contended bucket: ask the client to back off briefly
+    return 1 / rate
+
+def _applies(methods, when, args, kwargs):
+    if when is not None:
+        return when(*args, **kwargs)
+    return request.method in methods
+
+def rate_limit(endpoint, limit, period, methods=('POST',), when=None):
+    """
+    Limit each user to `limit` requests to the endpoint per `period` seconds.
+
+    Only requests using one of `methods` count, unless `when` is given: it is
+    called with the view's arguments and decides whether the request counts.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if (current_app.config['RATELIMIT_ENABLED'] and current_user.is_authenticated
+                    and _applies(methods, when, args, kwargs)):
+                retry_after = take_token(current_user.id, endpoint, limit, period)
+                if retry_after:
+                    return too_many_requests('Rate limit exceeded, please try again later', retry_after)
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+def _get_admission_slots():
+    global _admission_slots
+    with _admission_lock:
+        if _admission_slots is None:
+            _admission_slots = threading.BoundedSemaphore(current_app.config['ADMISSION_MAX_IN_FLIGHT'])
+        return _admission_slots
+
+def admission_control(methods=('POST',), when=None):
+    """
+    Bound how many expensive requests a worker runs and queues at once.
+
+    Requests beyond ADMISSION_MAX_IN_FLIGHT wait for a slot; once
+    ADMISSION_MAX_QUEUE requests are already waiting, or a slot does not free
+    up within ADMISSION_QUEUE_TIMEOUT seconds, the request is turned away
+    with a 429 instead of adding to everyone's latency. `methods` and `when`
+    select the expensive requests as for rate_limit().
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            global _admission_waiting
+            if not _applies(methods, when, args, kwargs):
+                return view(*args, **kwargs)
+
+            config = current_app.config
+            slots = _get_admission_slots()
+
+            with _admission_lock:
+                if _admission_waiting >= config['ADMISSION_MAX_QUEUE']:
+                    return too_many_requests('Server is busy, please try again shortly', config['ADMISSION_QUEUE_TIMEOUT'])
+                _admission_waiting += 1
+
+            try:
+                acquired = slots.acquire(timeout=config['ADMISSION_QUEUE_TIMEOUT'])
+            finally:
+                with _admission_lock:
+                    _admission_waiting -= 1
+
+            if not acquired:
+                return too_many_requests('Server is busy, please try again shortly', config['ADMISSION_QUEUE_TIMEOUT'])
+
+            try:
+                return view(*args, **kwargs)
+            finally:
+                slots.release()
+        return wrapped
+    return decorator
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from studyai_web_deployment.app import db
+from studyai_web_deployment.app.models.models import Document, Flashcard, FlashcardReview
+
+# Grades follow SM-2: 0-2 means the card was forgotten, 3-5 recalled with decreasing effort
+MIN_GRADE = 0
+MAX_GRADE = 5
+PASSING_GRADE = 3
+
+MIN_EASE_FACTOR = 1.3
+
+# Most cards returned from the due queue in a single fetch
+MAX_DUE_BATCH = 100
+
+
+def schedule_new_cards(user_id, flashcard_ids, now=None):
+    """
+    Create review state for new flashcards so they enter the user's due queue immediately
+    """
+    now = now or datetime.utcnow()
+    db.session.bulk_insert_mappings(FlashcardReview, [
+        {'user_id': user_id, 'flashcard_id': card_id, 'due_at': now}
+        for card_id in flashcard_ids
+    ])
+
+def schedule_unreviewed_cards(user_id, document_id):
+    """
+    Give cards of a document that predate the scheduler a review state
+    """
+    missing = db.session.query(Flashcard.id).outerjoin(
+        FlashcardReview,
+        (FlashcardReview.flashcard_id == Flashcard.id) & (FlashcardReview.user_id == user_id)
+    ).filter(Flashcard.document_id == document_id, FlashcardReview.id.is_(None)).all()
+
+    if missing:
+        schedule_new_cards(user_id, [card_id for (card_id,) in missing])
+        db.session.commit()
+
+def schedule_all_unreviewed_cards(now=None):
+    """
+    Give every card that predates the scheduler a review state for its document's owner.
+
+    Run on upgrade so decks nobody has reopened still show up in the due
+    queue. Returns the number of cards scheduled.
+    """
+    missing = db.session.query(Document.user_id, Flashcard.id).join(
+        Document, Flashcard.document_id == Document.id
+    ).outerjoin(
+        FlashcardReview,
+        (FlashcardReview.flashcard_id == Flashcard.id) & (FlashcardReview.user_id == Document.user_id)
+    ).filter(FlashcardReview.id.is_(None)).all()
+    if not missing:
+        return 0
+
+    now = now or datetime.utcnow()
+    db.session.bulk_insert_mappings(FlashcardReview, [
+        {'user_id': user_id, 'flashcard_id': card_id, 'due_at': now}
+        for user_id, card_id in missing
+    ])
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker starting up at the same time backfilled them first
+        db.session.rollback()
+        return 0
+    return len(missing)
+
+def due_cards(user_id, limit=20, now=None):
+    """
+    Return the user's most overdue cards across all documents.
+
+    Served by the (user_id, due_at) index, so the cost grows with the number
+    of cards returned rather than the size of the user's collection.
+    """
+    now = now or datetime.utcnow()
+    return db.session.query(FlashcardReview, Flashcard).join(
+        Flashcard, FlashcardReview.flashcard_id == Flashcard.id
+    ).filter(
+        FlashcardReview.user_id == user_id,
+        FlashcardReview.due_at <= now
+    ).order_by(FlashcardReview.due_at).limit(min(limit, MAX_DUE_BATCH)).all()
+
+def apply_grade(review, grade, now=None):
+    """
+    Update a card's review state with the SM-2 algorithm
+    """
+    now = now or datetime.utcnow()
+
+    if grade < PASSING_GRADE:
+        # Forgotten cards restart their learning sequence
+        review.repetitions = 0
+        review.interval_days = 1
+        review.lapses += 1
+    else:
+        review.repetitions += 1
+        if review.repetitions == 1:
+            review.interval_days = 1
+        elif review.repetitions == 2:
+            review.interval_days = 6
+        else:
+            review.interval_days = max(1, round(review.interval_days * review.ease_factor))
+
+    review.ease_factor = max(
+        MIN_EASE_FACTOR,
+        review.ease_factor + 0.1 - (MAX_GRADE - grade) * (0.08 + (MAX_GRADE - grade) * 0.02)
+    )
+    review.last_reviewed_at = now
+    review.due_at = now + timedelta(days=review.interval_days)
+    return review
+
+def submit_reviews(user_id, grades, now=None):
+    """
+    Apply a batch of {flashcard_id: grade} results in one query and one commit
+    """
+    now = now or datetime.utcnow()
+    reviews = FlashcardReview.query.filter(
+        FlashcardReview.user_id == user_id,
+        FlashcardReview.flashcard_id.in_(list(grades))
+    ).all()
+
+    for review in reviews:
+        apply_grade(review, grades[review.flashcard_id], now)
+
+    db.session.commit()
+    return reviews
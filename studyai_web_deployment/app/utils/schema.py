@@ -0,0 +1,109 @@
+from sqlalchemy import inspect
+from sqlalchemy.exc import DatabaseError
+from studyai_web_deployment.app import db
+from studyai_web_deployment.app.models.models import Document, Quiz, UploadSession
+
+# Columns added to tables that already exist in deployed databases. db.create_all()
+# only creates missing tables, so these are added by upgrade_schema() instead.
+# Append new entries here whenever a column is added to an existing model.
+ADDED_COLUMNS = [
+    (Document, 'content_version'),
+    (Document, 'blob_sha256'),
+    (Document, 'index_size'),
+    (Document, 'status'),
+    (Document, 'processing_error'),
+    (Document, 'processing_started_at'),
+    (Quiz, 'archived_at'),
+]
+
+# String columns whose length grew after they were first deployed
+WIDENED_COLUMNS = [
+    (Document, 'content_type'),
+    (UploadSession, 'content_type'),
+]
+
+
+def _column_names(table_name):
+    return {column['name'] for column in inspect(db.engine).get_columns(table_name)}
+
+def _add_column_sql(column):
+    """
+    Build an ALTER TABLE statement adding a model column, filling existing rows with its default
+    """
+    dialect = db.engine.dialect
+    quote = dialect.identifier_preparer.quote
+    sql = f'ALTER TABLE {quote(column.table.name)} ADD COLUMN {quote(column.name)} {column.type.compile(dialect=dialect)}'
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        sql += f' REFERENCES {quote(target.table.name)} ({quote(target.name)})'
+    if column.default is not None and column.default.is_scalar:
+        sql += f' DEFAULT {column.default.arg!r}'
+        if not column.nullable:
+            sql += ' NOT NULL'
+    return sql
+
+def _widen_column_sql(column):
+    """
+    Build a statement changing a column to its model type, or None if the database ignores lengths
+    """
+    dialect = db.engine.dialect
+    quote = dialect.identifier_preparer.quote
+    table, name, type_ = quote(column.table.name), quote(column.name), column.type.compile(dialect=dialect)
+    if dialect.name == 'sqlite':
+        return None
+    if dialect.name in ('mysql', 'mariadb'):
+        return f'ALTER TABLE {table} MODIFY {name} {type_}'
+    return f'ALTER TABLE {table} ALTER COLUMN {name} TYPE {type_}'
+
+def upgrade_schema(echo=None):
+    """
+    Bring tables created by older versions of the app up to date with the models.
+
+    Safe to run repeatedly and from several processes at once: columns that
+    are already up to date are skipped. Returns the statements that were executed.
+    """
+    executed = []
+    existing_tables = set(inspect(db.engine).get_table_names())
+    for model, name in ADDED_COLUMNS:
+        table = model.__table__
+        if table.name not in existing_tables or name in _column_names(table.name):
+            continue
+
+        column = table.c[name]
+        sql = _add_column_sql(column)
+        try:
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql(sql)
+        except DatabaseError:
+            # Another worker added the column first
+            if name not in _column_names(table.name):
+                raise
+            continue
+        executed.append(sql)
+        if echo:
+            echo(sql)
+
+        for index in table.indexes:
+            if name in index.columns:
+                index.create(db.engine, checkfirst=True)
+
+    for model, name in WIDENED_COLUMNS:
+        table = model.__table__
+        if table.name not in existing_tables:
+            continue
+        current = {column['name']: column['type'] for column in inspect(db.engine).get_columns(table.name)}
+        length = getattr(current.get(name), 'length', None)
+        column = table.c[name]
+        if length is None or length >= column.type.length:
+            continue
+
+        sql = _widen_column_sql(column)
+        if sql is None:
+            continue
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql(sql)
+        executed.append(sql)
+        if echo:
+            echo(sql)
+
+    return executed
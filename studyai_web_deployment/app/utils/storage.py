@@ -0,0 +1,287 @@
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from studyai_web_deployment.app import db
+from studyai_web_deployment.app.models.models import Blob, Document, UploadSession, User
+
+# Size of the blocks read when hashing files
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Files and directories younger than this are left alone by garbage collection,
+# since they may belong to an upload or ingestion that has not committed yet
+GC_GRACE_PERIOD = 60 * 60
+
+# Resumable uploads that have not received data for this long are abandoned
+STALE_UPLOAD_AGE = timedelta(days=7)
+
+# Where indexes were written before DATA_FOLDER, relative to the working directory
+LEGACY_DATA_FOLDER = os.path.join('app', 'data')
+
+
+def document_data_dir(document):
+    """
+    Return the directory holding a document's vector index
+    """
+    return os.path.join(current_app.config['DATA_FOLDER'], str(document.user_id), str(document.id))
+
+def migrate_legacy_indexes():
+    """
+    Move indexes written under LEGACY_DATA_FOLDER into DATA_FOLDER.
+
+    Indexes already present in DATA_FOLDER are left alone, so running this
+    again, or from several workers at once, is harmless. Moved indexes get
+    their size recorded for disk usage reports. Returns the number moved.
+    """
+    data_folder = current_app.config['DATA_FOLDER']
+    if not os.path.isdir(LEGACY_DATA_FOLDER) or os.path.abspath(LEGACY_DATA_FOLDER) == os.path.abspath(data_folder):
+        return 0
+
+    moved = 0
+    for user_dir in os.scandir(LEGACY_DATA_FOLDER):
+        if not user_dir.is_dir() or not user_dir.name.isdigit():
+            continue
+        for doc_dir in os.scandir(user_dir.path):
+            target = os.path.join(data_folder, user_dir.name, doc_dir.name)
+            if not doc_dir.is_dir() or os.path.exists(target):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                shutil.move(doc_dir.path, target)
+            except (OSError, shutil.Error):
+                # Another worker moved it first
+                continue
+            moved += 1
+            if doc_dir.name.isdigit():
+                Document.query.filter_by(id=int(doc_dir.name), index_size=0).update(
+                    {'index_size': _directory_size(target)}
+                )
+
+    db.session.commit()
+    return moved
+
+def incoming_path(name):
+    """
+    Return a path in the staging area for files that are still being received
+    """
+    incoming_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'incoming')
+    os.makedirs(incoming_dir, exist_ok=True)
+    return os.path.join(incoming_dir, name)
+
+def file_checksum(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def _blob_path(sha256):
+    # Two levels of fan-out keep every directory small. The random suffix gives content
+    # stored again after garbage collection a fresh path, so a collection that is still
+    # unlinking the old file can never remove the new one.
+    name = f'{sha256}.{uuid.uuid4().hex[:12]}'
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], 'blobs', sha256[:2], sha256[2:4], name)
+
+def _directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def _remove_path(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+def _older_than_grace_period(path):
+    try:
+        return time.time() - os.path.getmtime(path) > GC_GRACE_PERIOD
+    except OSError:
+        return False
+
+def store_file(src_path, checksum=None, move=True):
+    """
+    Move a file into the content-addressed blob store and take a reference to it.
+
+    Identical content is stored once: if the blob already exists the source
+    file is discarded and the blob's reference count is bumped instead. With
+    move=False the source is copied and always left in place. The caller
+    commits the session.
+    """
+    sha256 = checksum or file_checksum(src_path)
+
+    if Blob.query.filter_by(sha256=sha256).update({'ref_count': Blob.ref_count + 1}):
+        if move:
+            os.remove(src_path)
+        return db.session.get(Blob, sha256)
+
+    path = _blob_path(sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    size = os.path.getsize(src_path)
+    if move:
+        os.replace(src_path, path)
+    else:
+        # Copy next to the blob first so readers never see a partial file
+        temp_path = f'{path}.tmp'
+        shutil.copyfile(src_path, temp_path)
+        os.replace(temp_path, path)
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(Blob(sha256=sha256, size=size, path=path, ref_count=1))
+    except IntegrityError:
+        # Another request stored the same content at the same time; share its blob
+        os.remove(path)
+        Blob.query.filter_by(sha256=sha256).update({'ref_count': Blob.ref_count + 1})
+
+    return db.session.get(Blob, sha256)
+
+def release_blob(sha256):
+    """
+    Drop one reference to a blob; unreferenced blobs are reclaimed by garbage collection
+    """
+    Blob.query.filter(Blob.sha256 == sha256, Blob.ref_count > 0).update({'ref_count': Blob.ref_count - 1})
+
+def delete_document(document):
+    """
+    Delete a document along with its index and its reference to the uploaded file.
+
+    The row is deleted and committed before anything is removed from disk, so
+    a failed commit never leaves a document whose files are gone.
+    """
+    paths = [document_data_dir(document)]
+    if document.blob_sha256:
+        release_blob(document.blob_sha256)
+    else:
+        # Uploads from before the blob store live in their own directory
+        paths.append(os.path.dirname(document.file_path))
+
+    db.session.delete(document)
+    db.session.commit()
+    for path in paths:
+        _remove_path(path)
+
+def collect_garbage(dry_run=False):
+    """
+    Reclaim disk space no database row refers to any more.
+
+    Removes unreferenced blobs, blob files without a row, upload and index
+    directories of deleted documents, and abandoned resumable uploads.
+    Returns a dict of item counts and bytes reclaimed per category.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    data_folder = current_app.config['DATA_FOLDER']
+    report = {}
+
+    def reclaim(category, path, size=None):
+        entry = report.setdefault(category, {'count': 0, 'bytes': 0})
+        entry['count'] += 1
+        if size is None:
+            size = _directory_size(path) if os.path.isdir(path) else os.path.getsize(path)
+        entry['bytes'] += size
+        if not dry_run:
+            _remove_path(path)
+
+    # Blobs whose last reference went away. The rows are deleted and committed before
+    # any file is unlinked, so no upload can take a reference to a file being removed.
+    unreferenced = []
+    for blob in Blob.query.filter(Blob.ref_count <= 0).all():
+        # Only drop the row if nothing took a new reference in the meantime
+        if dry_run or Blob.query.filter_by(sha256=blob.sha256, ref_count=0).delete():
+            unreferenced.append((blob.path, blob.size))
+    if not dry_run:
+        db.session.commit()
+    for path, size in unreferenced:
+        if os.path.exists(path):
+            reclaim('unreferenced_blobs', path, size)
+
+    # Blob files left behind without a row, e.g. by a crash mid-upload
+    known_blobs = {os.path.basename(path) for (path,) in db.session.query(Blob.path)}
+    blob_root = os.path.join(upload_folder, 'blobs')
+    for root, _, files in os.walk(blob_root):
+        for name in files:
+            path = os.path.join(root, name)
+            if name not in known_blobs and _older_than_grace_period(path):
+                reclaim('orphaned_blobs', path)
+
+    # Per-document upload directories from before the blob store
+    legacy_dirs = {
+        os.path.dirname(file_path)
+        for (file_path,) in db.session.query(Document.file_path).filter(Document.blob_sha256.is_(None))
+    }
+    for user_dir in os.scandir(upload_folder):
+        if not user_dir.is_dir() or not user_dir.name.isdigit():
+            continue
+        for doc_dir in os.scandir(user_dir.path):
+            if doc_dir.path not in legacy_dirs and _older_than_grace_period(doc_dir.path):
+                reclaim('orphaned_upload_dirs', doc_dir.path)
+
+    # Vector indexes of documents that no longer exist
+    if os.path.isdir(data_folder):
+        documents = set(db.session.query(Document.user_id, Document.id))
+        for user_dir in os.scandir(data_folder):
+            if not user_dir.is_dir() or not user_dir.name.isdigit():
+                continue
+            for doc_dir in os.scandir(user_dir.path):
+                key = (int(user_dir.name), int(doc_dir.name)) if doc_dir.name.isdigit() else None
+                if key not in documents and _older_than_grace_period(doc_dir.path):
+                    reclaim('orphaned_index_dirs', doc_dir.path)
+
+    # Resumable uploads that were abandoned, and part files without a session
+    cutoff = datetime.utcnow() - STALE_UPLOAD_AGE
+    for upload in UploadSession.query.filter(UploadSession.updated_at < cutoff).all():
+        if os.path.exists(upload.temp_path):
+            reclaim('stale_uploads', upload.temp_path)
+        if not dry_run:
+            db.session.delete(upload)
+    if not dry_run:
+        db.session.commit()
+
+    live_parts = {os.path.basename(path) for (path,) in db.session.query(UploadSession.temp_path)}
+    incoming_dir = os.path.join(upload_folder, 'incoming')
+    if os.path.isdir(incoming_dir):
+        for entry in os.scandir(incoming_dir):
+            if entry.name not in live_parts and _older_than_grace_period(entry.path):
+                reclaim('orphaned_incoming_files', entry.path)
+
+    return report
+
+def disk_usage():
+    """
+    Return (user, upload_bytes, index_bytes, document_count) for every user.
+
+    Upload sizes come from the blob rows and index sizes are recorded at
+    ingestion, so no directories are scanned; only uploads from before the
+    blob store are sized from disk. A blob shared by several users counts
+    towards each of them.
+    """
+    # Count each blob once per user even if several of their documents share it
+    user_blobs = db.session.query(Document.user_id, Document.blob_sha256).filter(
+        Document.blob_sha256.isnot(None)
+    ).distinct().subquery()
+    uploads = dict(db.session.query(user_blobs.c.user_id, func.sum(Blob.size)).join(
+        Blob, user_blobs.c.blob_sha256 == Blob.sha256
+    ).group_by(user_blobs.c.user_id).all())
+    legacy = db.session.query(Document.user_id, Document.file_path).filter(Document.blob_sha256.is_(None))
+    for user_id, file_path in legacy:
+        try:
+            uploads[user_id] = (uploads.get(user_id) or 0) + os.path.getsize(file_path)
+        except OSError:
+            pass
+    indexes = dict(db.session.query(Document.user_id, func.sum(Document.index_size)).group_by(Document.user_id).all())
+    counts = dict(db.session.query(Document.user_id, func.count(Document.id)).group_by(Document.user_id).all())
+
+    return [
+        (user, uploads.get(user.id) or 0, indexes.get(user.id) or 0, counts.get(user.id) or 0)
+        for user in User.query.order_by(User.id).all()
+    ]
@@ -9,7 +9,16 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///studyai.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.path.join('app', 'uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload size
+    DATA_FOLDER = os.path.join('app', 'data')
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max request size
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB max chunk for resumable uploads
+    MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE', 2 * 1024 * 1024 * 1024))  # 2GB max resumable upload
+    FRAGMENT_CACHE_PATH = os.environ.get('FRAGMENT_CACHE_PATH', os.path.join('app', 'cache', 'fragments.sqlite'))
+    FRAGMENT_CACHE_MAX_ENTRIES = 10000
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', '1') == '1'
+    ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 16))  # expensive requests per worker
+    ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 32))
+    ADMISSION_QUEUE_TIMEOUT = int(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 10))  # seconds
     HUGGINGFACEHUB_API_TOKEN = os.environ.get('HUGGINGFACEHUB_API_TOKEN', '')
 
 class DevelopmentConfig(Config):
@@ -26,6 +35,7 @@ class ProductionConfig(Config):
 
 class TestingConfig(Config):
     TESTING = True
+    RATELIMIT_ENABLED = False
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
 
 config = {
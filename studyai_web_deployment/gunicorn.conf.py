@@ -0,0 +1,20 @@
+import os
+
+# Gevent workers keep serving other requests while a study request waits on the
+# remote model; set GUNICORN_WORKER_CLASS=sync to fall back to one request per worker
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+
+# Every worker loads its own copy of the embedding model, so keep the default
+# small enough for a typical dyno; raise WEB_CONCURRENCY on larger machines
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Concurrent connections per gevent worker
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 200))
+
+# Remote model calls can take a while, so give requests more than the default 30s
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Each worker must import the app after gevent has patched the standard library
+preload_app = False
@@ -0,0 +1,85 @@
+"""
+Load test for the document query endpoint.
+
+Sends concurrent questions to /document/<id>/query and reports throughput and
+latency, normalized per gunicorn worker. Run it once against sync workers and
+once against gevent workers to compare how many queries each worker can hold
+open while waiting on the model:
+
+    GUNICORN_WORKER_CLASS=sync WEB_CONCURRENCY=2 gunicorn -c studyai_web_deployment/gunicorn.conf.py studyai_web_deployment.run:app
+    python studyai_web_deployment/scripts/load_test.py --doc-id 1 --cookie "session=..." --workers 2
+
+    GUNICORN_WORKER_CLASS=gevent WEB_CONCURRENCY=2 gunicorn -c studyai_web_deployment/gunicorn.conf.py studyai_web_deployment.run:app
+    python studyai_web_deployment/scripts/load_test.py --doc-id 1 --cookie "session=..." --workers 2
+
+The session cookie can be copied from a logged-in browser.
+"""
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def send_query(url, cookie, question, timeout):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps({'query': question}).encode('utf-8'),
+        headers={'Content-Type': 'application/json', 'Cookie': cookie},
+        method='POST'
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, TimeoutError):
+        status = None
+    return status, time.perf_counter() - start
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure concurrent query capacity of a StudyAI deployment')
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--doc-id', type=int, required=True)
+    parser.add_argument('--cookie', required=True, help='Session cookie of a user who owns the document')
+    parser.add_argument('--concurrency', type=int, default=32, help='Number of simultaneous clients')
+    parser.add_argument('--requests', type=int, default=128, help='Total number of queries to send')
+    parser.add_argument('--workers', type=int, default=1, help='Gunicorn worker count, used to normalize results')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--question', default='What are the main ideas of this document?')
+    args = parser.parse_args()
+
+    url = f'{args.base_url.rstrip("/")}/document/{args.doc_id}/query'
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(send_query, url, args.cookie, args.question, args.timeout)
+            for _ in range(args.requests)
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for status, latency in results if status == 200]
+    failures = len(results) - len(latencies)
+    throughput = len(latencies) / elapsed if elapsed else 0.0
+    # Little's law: average number of queries in flight, including any queued at the server
+    in_flight = throughput * (sum(latencies) / len(latencies)) if latencies else 0.0
+
+    print(f'Requests:            {len(results)} ({failures} failed)')
+    print(f'Elapsed:             {elapsed:.1f}s')
+    print(f'Throughput:          {throughput:.2f} queries/s ({throughput / args.workers:.2f} per worker)')
+    print(f'Latency p50/p95:     {percentile(latencies, 0.5):.2f}s / {percentile(latencies, 0.95):.2f}s')
+    print(f'Queries in flight:   {in_flight:.1f} ({in_flight / args.workers:.1f} per worker)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import pytest
+from flask import Flask
+from studyai_web_deployment.app import db
+from studyai_web_deployment.app.models.models import Document, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    A bare app with just the database, so tests do not need the model stack that create_app() imports
+    """
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SECRET_KEY='test',
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'test.db'}",
+        UPLOAD_FOLDER=str(tmp_path / 'uploads'),
+        DATA_FOLDER=str(tmp_path / 'data'),
+        RATELIMIT_ENABLED=True,
+        ADMISSION_MAX_IN_FLIGHT=2,
+        ADMISSION_MAX_QUEUE=1,
+        ADMISSION_QUEUE_TIMEOUT=0.1,
+    )
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+@pytest.fixture
+def user(app):
+    user = User(username='student', email='student@example.com')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def document(user):
+    document = Document(title='Notes', filename='notes.txt', file_path='notes.txt', user_id=user.id)
+    db.session.add(document)
+    db.session.commit()
+    return document
@@ -0,0 +1,101 @@
+import zipfile
+from studyai_web_deployment.app.utils import extractors
+from studyai_web_deployment.app.utils.extractors import extract_sections, get_extractor, sniff_mime_type
+
+WORD_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+DRAWING_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+
+
+def test_text_without_newlines_is_split_into_sections(tmp_path, monkeypatch):
+    monkeypatch.setattr(extractors, 'READ_BLOCK_SIZE', 100)
+    monkeypatch.setattr(extractors, 'SECTION_SIZE', 250)
+    path = tmp_path / 'notes.txt'
+    path.write_text('x' * 1000)
+
+    sections = list(extract_sections(str(path)))
+    assert [len(text) for text, _ in sections] == [300, 300, 300, 100]
+    assert [metadata['section'] for _, metadata in sections] == [0, 1, 2, 3]
+    assert all(metadata['source'] == 'notes.txt' for _, metadata in sections)
+
+def test_html_text_skips_scripts(tmp_path):
+    path = tmp_path / 'page.html'
+    path.write_text('<html><head><title>t</title></head><body><script>var a;</script><p>Hello</p></body></html>')
+
+    text = ''.join(text for text, _ in extract_sections(str(path)))
+    assert 'Hello' in text
+    assert 'var a' not in text
+
+def _write_zip(path, files):
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return str(path)
+
+def _docx(path):
+    return _write_zip(path, {'word/document.xml': f'''<?xml version="1.0"?>
+<w:document xmlns:w="{WORD_NS}"><w:body>
+  <w:p><w:r><w:t>Intro </w:t></w:r><w:r><w:t>paragraph</w:t></w:r></w:p>
+  <w:tbl><w:tr><w:tc><w:p><w:r><w:t>In a table</w:t></w:r></w:p></w:tc></w:tr></w:tbl>
+</w:body></w:document>'''})
+
+def _slide(text):
+    return f'<p:sld xmlns:p="p" xmlns:a="{DRAWING_NS}"><a:p><a:r><a:t>{text}</a:t></a:r></a:p></p:sld>'
+
+def _pptx(path):
+    return _write_zip(path, {
+        'ppt/slides/slide10.xml': _slide('Ten'),
+        'ppt/slides/slide2.xml': _slide('Two'),
+        'ppt/slides/slide1.xml': _slide('One'),
+    })
+
+def _epub(path):
+    return _write_zip(path, {
+        'mimetype': 'application/epub+zip',
+        'META-INF/container.xml': '''<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles><rootfile full-path="OEBPS/content.opf"/></rootfiles></container>''',
+        'OEBPS/content.opf': '''<package xmlns="http://www.idpf.org/2007/opf">
+  <manifest>
+    <item id="c1" href="Chapter%201.xhtml#start"/>
+    <item id="gone" href="missing.xhtml"/>
+    <item id="c2" href="text/two.xhtml"/>
+  </manifest>
+  <spine><itemref idref="c1"/><itemref idref="gone"/><itemref idref="c2"/></spine>
+</package>''',
+        'OEBPS/Chapter 1.xhtml': '<html><body><p>First chapter</p></body></html>',
+        'OEBPS/text/two.xhtml': '<html><body><p>Second chapter</p></body></html>',
+    })
+
+def test_docx_includes_table_paragraphs(tmp_path):
+    sections = list(extract_sections(_docx(tmp_path / 'doc.docx')))
+    assert sections[0][0] == 'Intro paragraph\nIn a table\n'
+
+def test_pptx_slides_are_in_numeric_order(tmp_path):
+    sections = list(extract_sections(_pptx(tmp_path / 'deck.pptx')))
+    assert [(text, metadata['slide']) for text, metadata in sections] == [('One', 1), ('Two', 2), ('Ten', 10)]
+
+def test_epub_decodes_hrefs_and_skips_missing_chapters(tmp_path):
+    sections = list(extract_sections(_epub(tmp_path / 'book.epub')))
+    assert [(text.strip(), metadata['chapter']) for text, metadata in sections] == [
+        ('First chapter', 0), ('Second chapter', 2)
+    ]
+
+def test_sniffs_mime_type_of_files_without_extension(tmp_path):
+    assert sniff_mime_type(_docx(tmp_path / 'a')) == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+    assert sniff_mime_type(_pptx(tmp_path / 'b')) == 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+    assert sniff_mime_type(_epub(tmp_path / 'c')) == 'application/epub+zip'
+
+    pdf = tmp_path / 'd'
+    pdf.write_bytes(b'%PDF-1.4\n')
+    html = tmp_path / 'e'
+    html.write_text('  <!DOCTYPE html><html></html>')
+    text = tmp_path / 'f'
+    text.write_text('plain notes')
+    binary = tmp_path / 'g'
+    binary.write_bytes(b'\x00\x01\x02')
+    assert [sniff_mime_type(str(path)) for path in (pdf, html, text, binary)] == [
+        'application/pdf', 'text/html', 'text/plain', None
+    ]
+
+def test_get_extractor_falls_back_to_sniffing(tmp_path):
+    assert get_extractor(_pptx(tmp_path / 'upload.bin')).name == 'pptx'
+    assert get_extractor(str(tmp_path / 'upload.bin'), 'deck.bin', 'application/epub+zip').name == 'epub'
@@ -0,0 +1,84 @@
+from studyai_web_deployment.app.utils.output_parser import (
+    FLASHCARD_SCHEMA, QUIZ_SCHEMA, generate_items, iter_json_objects, parse_items
+)
+
+
+def test_parses_complete_array():
+    text = 'Here you go: [{"front": "a", "back": "b"}, {"front": "c", "back": "d"}]'
+    assert parse_items(text, FLASHCARD_SCHEMA, 'front') == [
+        {'front': 'a', 'back': 'b'},
+        {'front': 'c', 'back': 'd'},
+    ]
+
+def test_salvages_items_before_truncation():
+    text = '[{"front": "a", "back": "b"}, {"front": "c", "back": "d"}, {"front": "e", "ba'
+    assert [item['front'] for item in parse_items(text, FLASHCARD_SCHEMA, 'front')] == ['a', 'c']
+
+def test_salvages_items_from_truncated_wrapper():
+    text = '{"flashcards": [{"front": "a", "back": "b"}, {"front": "c", "back": "d"}, {"front": "e", "ba'
+    assert [item['front'] for item in parse_items(text, FLASHCARD_SCHEMA, 'front')] == ['a', 'c']
+
+def test_unwraps_complete_wrapper():
+    text = '{"questions": [{"question": "q", "options": ["w", "x", "y", "z"], "correct_answer": 1}]}'
+    assert parse_items(text, QUIZ_SCHEMA, 'question') == [
+        {'question': 'q', 'options': ['w', 'x', 'y', 'z'], 'correct_answer': 1}
+    ]
+
+def test_skips_unclosed_object_followed_by_valid_ones():
+    text = '[{"front": "a", "back": "b" {"front": "c", "back": "d"}]'
+    assert parse_items(text, FLASHCARD_SCHEMA, 'front') == [{'front': 'c', 'back': 'd'}]
+
+def test_skips_malformed_object_and_keeps_the_rest():
+    text = '[{"front": "a", back: }, {"front": "c", "back": "d"}]'
+    assert parse_items(text, FLASHCARD_SCHEMA, 'front') == [{'front': 'c', 'back': 'd'}]
+
+def test_accepts_python_style_literals():
+    text = "[{'front': 'a', 'back': 'b',}]"
+    assert parse_items(text, FLASHCARD_SCHEMA, 'front') == [{'front': 'a', 'back': 'b'}]
+
+def test_braces_inside_strings_do_not_split_objects():
+    text = '[{"front": "what is {x}?", "back": "a set"}]'
+    assert list(iter_json_objects(text)) == [{'front': 'what is {x}?', 'back': 'a set'}]
+
+def test_rejects_items_failing_schema():
+    text = ('[{"front": "", "back": "b"}, {"front": "a"},'
+            ' {"question": "q", "options": ["x", "y"], "correct_answer": 5}]')
+    assert parse_items(text, FLASHCARD_SCHEMA, 'front') == []
+    assert parse_items(text, QUIZ_SCHEMA, 'question') == []
+
+def test_coerces_numeric_answer_index():
+    text = '[{"question": "q", "options": ["x", "y"], "correct_answer": "1"}]'
+    assert parse_items(text, QUIZ_SCHEMA, 'question')[0]['correct_answer'] == 1
+
+def test_skips_literals_that_fail_to_evaluate():
+    text = '[{"front": "a", "back": "b"}, {["x"]: 1}, {{"front": "c", "back": "d"}}]'
+    assert [item['front'] for item in parse_items(text, FLASHCARD_SCHEMA, 'front')] == ['a', 'c']
+
+def test_drops_duplicates():
+    text = '[{"front": "A", "back": "b"}, {"front": "a", "back": "c"}]'
+    assert len(parse_items(text, FLASHCARD_SCHEMA, 'front')) == 1
+
+def test_generate_items_only_requests_missing_items():
+    prompts = []
+    responses = iter([
+        '[{"front": "a", "back": "1"}, {"front": "b", "ba',
+        '[{"front": "a", "back": "1"}, {"front": "c", "back": "3"}]',
+    ])
+
+    def llm(prompt):
+        prompts.append(prompt)
+        return next(responses)
+
+    items = generate_items(llm, lambda missing, existing: missing, FLASHCARD_SCHEMA, 'front', 2)
+    assert [item['front'] for item in items] == ['a', 'c']
+    assert prompts == [2, 1]
+
+def test_generate_items_gives_up_after_max_attempts():
+    calls = []
+
+    def llm(prompt):
+        calls.append(prompt)
+        return 'not json'
+
+    assert generate_items(llm, lambda missing, existing: missing, FLASHCARD_SCHEMA, 'front', 3, max_attempts=2) == []
+    assert len(calls) == 2
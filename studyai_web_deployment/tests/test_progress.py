@@ -0,0 +1,56 @@
+from datetime import datetime
+from studyai_web_deployment.app import db
+from studyai_web_deployment.app.models.models import (
+    QuizAttempt, Quiz, QuizQuestion, UserDocumentStats, UserQuestionStats
+)
+from studyai_web_deployment.app.utils.progress import _insert_or_update, record_attempt, weakest_questions
+
+NOW = datetime(2026, 1, 1, 12, 0)
+
+
+def _quiz(document, count=2):
+    quiz = Quiz(document_id=document.id)
+    db.session.add(quiz)
+    db.session.flush()
+    questions = [QuizQuestion(question_text=f'Question {i}', quiz_id=quiz.id) for i in range(count)]
+    db.session.add_all(questions)
+    db.session.commit()
+    return quiz, [question.id for question in questions]
+
+def test_attempts_accumulate_in_aggregates(user, document):
+    quiz, (q1, q2) = _quiz(document)
+    record_attempt(user.id, quiz, [(q1, None, True), (q2, None, False)], now=NOW)
+    record_attempt(user.id, quiz, [(q1, None, True), (q2, None, True)], now=NOW)
+    record_attempt(user.id, quiz, [(q1, None, False), (q2, None, False)], now=NOW)
+
+    stats = UserDocumentStats.query.filter_by(user_id=user.id, document_id=document.id).one()
+    assert (stats.attempts, stats.questions_answered, stats.correct_answers) == (3, 6, 3)
+    assert (stats.best_percentage, stats.last_percentage) == (100, 0)
+
+    first = UserQuestionStats.query.filter_by(user_id=user.id, question_id=q1).one()
+    assert (first.attempts, first.correct_answers, first.last_correct) == (3, 2, False)
+    assert QuizAttempt.query.count() == 3
+
+def test_weakest_questions_are_ordered_by_accuracy(user, document):
+    quiz, (q1, q2) = _quiz(document)
+    record_attempt(user.id, quiz, [(q1, None, False), (q2, None, True)], now=NOW)
+    record_attempt(user.id, quiz, [(q1, None, True), (q2, None, False)], now=NOW)
+    record_attempt(user.id, quiz, [(q1, None, False), (q2, None, True)], now=NOW)
+
+    assert [stats.question_id for stats in weakest_questions(user.id)] == [q1, q2]
+
+def test_insert_race_falls_back_to_update_without_losing_the_transaction(user, document):
+    quiz, _ = _quiz(document)
+    db.session.add(UserDocumentStats(user_id=user.id, document_id=document.id, attempts=1))
+    db.session.commit()
+
+    # A concurrent request created the row between our UPDATE and INSERT
+    db.session.add(QuizAttempt(score=0, total=0, user_id=user.id, quiz_id=quiz.id))
+    updates = []
+    _insert_or_update(UserDocumentStats, {'user_id': user.id, 'document_id': document.id, 'attempts': 1},
+                      lambda: updates.append(True))
+    db.session.commit()
+
+    assert updates == [True]
+    assert QuizAttempt.query.count() == 1
+    assert UserDocumentStats.query.count() == 1
@@ -0,0 +1,111 @@
+import pytest
+from sqlalchemy import event
+from studyai_web_deployment.app import db
+from studyai_web_deployment.app.models.models import RateLimitBucket
+from studyai_web_deployment.app.utils import rate_limit
+from studyai_web_deployment.app.utils.rate_limit import admission_control, take_token, too_many_requests
+
+NOW = 1_000_000.0
+
+
+@pytest.fixture(autouse=True)
+def reset_admission(monkeypatch):
+    monkeypatch.setattr(rate_limit, '_admission_slots', None)
+    monkeypatch.setattr(rate_limit, '_admission_waiting', 0)
+
+def test_limit_is_enforced_with_retry_after(user):
+    assert all(take_token(user.id, 'query', 30, 60, now=NOW) == 0 for _ in range(30))
+
+    retry_after = take_token(user.id, 'query', 30, 60, now=NOW)
+    assert retry_after == pytest.approx(2.0)
+
+    response = too_many_requests('Rate limit exceeded', retry_after)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
+
+def test_tokens_refill_at_the_configured_rate(user):
+    for _ in range(5):
+        take_token(user.id, 'regenerate', 5, 600, now=NOW)
+    assert take_token(user.id, 'regenerate', 5, 600, now=NOW + 60) == pytest.approx(60.0)
+    assert take_token(user.id, 'regenerate', 5, 600, now=NOW + 120) == 0
+
+    bucket = RateLimitBucket.query.filter_by(user_id=user.id, endpoint='regenerate').one()
+    assert bucket.tokens == pytest.approx(0.0)
+    assert bucket.updated_at == NOW + 120
+
+def test_buckets_are_per_user_and_endpoint(user):
+    take_token(user.id, 'query', 1, 60, now=NOW)
+    assert take_token(user.id, 'query', 1, 60, now=NOW) > 0
+    assert take_token(user.id, 'other', 1, 60, now=NOW) == 0
+    assert take_token(user.id + 1, 'query', 1, 60, now=NOW) == 0
+
+def test_concurrent_update_is_retried_instead_of_spending_the_same_token(app, user):
+    take_token(user.id, 'query', 10, 60, now=NOW)
+    raced = []
+
+    # Another worker spends tokens between our read of the bucket and our update
+    @event.listens_for(db.engine, 'before_cursor_execute')
+    def race(conn, cursor, statement, parameters, context, executemany):
+        if not raced and statement.startswith('UPDATE rate_limit_bucket'):
+            raced.append(True)
+            conn.exec_driver_sql('UPDATE rate_limit_bucket SET tokens = 3, updated_at = ?', (NOW + 1,))
+
+    try:
+        assert take_token(user.id, 'query', 10, 60, now=NOW + 1) == 0
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', race)
+
+    db.session.expire_all()
+    bucket = RateLimitBucket.query.filter_by(user_id=user.id, endpoint='query').one()
+    assert raced == [True]
+    assert bucket.tokens == pytest.approx(2.0)
+
+def _guarded_view(**kwargs):
+    calls = []
+
+    @admission_control(**kwargs)
+    def view():
+        calls.append(True)
+        return 'ok'
+    return view, calls
+
+def test_admission_runs_view_and_releases_its_slot(app):
+    view, calls = _guarded_view()
+    with app.test_request_context(method='POST'):
+        assert view() == 'ok'
+        assert view() == 'ok'
+        slots = rate_limit._get_admission_slots()
+        assert slots.acquire(blocking=False) and slots.acquire(blocking=False)
+    assert len(calls) == 2
+
+def test_admission_times_out_when_no_slot_frees_up(app):
+    view, calls = _guarded_view()
+    with app.test_request_context(method='POST'):
+        slots = rate_limit._get_admission_slots()
+        slots.acquire()
+        slots.acquire()
+        response = view()
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+    assert calls == []
+    assert rate_limit._admission_waiting == 0
+
+def test_admission_rejects_when_queue_is_full(app, monkeypatch):
+    view, calls = _guarded_view()
+    monkeypatch.setattr(rate_limit, '_admission_waiting', 1)
+    with app.test_request_context(method='POST'):
+        response = view()
+    assert response.status_code == 429
+    assert calls == []
+
+def test_admission_skips_requests_that_do_not_generate(app):
+    view, calls = _guarded_view(when=lambda: False)
+    with app.test_request_context(method='POST'):
+        slots = rate_limit._get_admission_slots()
+        slots.acquire()
+        slots.acquire()
+        assert view() == 'ok'
+
+    get_view, _ = _guarded_view()
+    with app.test_request_context(method='GET'):
+        assert get_view() == 'ok'
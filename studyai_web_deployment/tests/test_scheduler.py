@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+from studyai_web_deployment.app import db
+from studyai_web_deployment.app.models.models import Flashcard, FlashcardReview, User
+from studyai_web_deployment.app.utils.scheduler import (
+    apply_grade, due_cards, schedule_all_unreviewed_cards, schedule_new_cards, submit_reviews
+)
+
+NOW = datetime(2026, 1, 1, 12, 0)
+
+
+def _review(**fields):
+    state = dict(ease_factor=2.5, interval_days=0, repetitions=0, lapses=0)
+    state.update(fields)
+    return FlashcardReview(**state)
+
+def _cards(document, count):
+    cards = [Flashcard(front=f'front {i}', back=f'back {i}', document_id=document.id) for i in range(count)]
+    db.session.add_all(cards)
+    db.session.commit()
+    return cards
+
+def test_first_two_passes_use_fixed_intervals():
+    review = apply_grade(_review(), 4, NOW)
+    assert (review.repetitions, review.interval_days, review.due_at) == (1, 1, NOW + timedelta(days=1))
+
+    review = apply_grade(review, 4, NOW)
+    assert (review.repetitions, review.interval_days) == (2, 6)
+
+def test_later_intervals_grow_by_ease_factor():
+    review = apply_grade(_review(repetitions=2, interval_days=6), 5, NOW)
+    assert review.repetitions == 3
+    assert review.interval_days == 15  # round(6 * 2.5)
+    assert review.ease_factor == 2.6
+
+def test_ease_factor_adjusts_with_grade():
+    assert apply_grade(_review(), 4, NOW).ease_factor == 2.5
+    assert round(apply_grade(_review(), 3, NOW).ease_factor, 2) == 2.36
+
+def test_failed_grade_resets_and_counts_a_lapse():
+    review = apply_grade(_review(repetitions=4, interval_days=30, lapses=1), 1, NOW)
+    assert (review.repetitions, review.interval_days, review.lapses) == (0, 1, 2)
+    assert review.due_at == NOW + timedelta(days=1)
+    assert review.last_reviewed_at == NOW
+
+def test_ease_factor_never_drops_below_minimum():
+    review = _review(ease_factor=1.35)
+    for _ in range(3):
+        apply_grade(review, 0, NOW)
+    assert review.ease_factor == 1.3
+
+def test_due_cards_are_most_overdue_first_and_exclude_future(user, document):
+    cards = _cards(document, 3)
+    offsets = [-1, -5, 2]  # days from now
+    db.session.add_all([
+        FlashcardReview(user_id=user.id, flashcard_id=card.id, due_at=NOW + timedelta(days=offset))
+        for card, offset in zip(cards, offsets)
+    ])
+    db.session.commit()
+
+    due = due_cards(user.id, now=NOW)
+    assert [card.id for _, card in due] == [cards[1].id, cards[0].id]
+    assert len(due_cards(user.id, limit=1, now=NOW)) == 1
+
+def test_submit_reviews_only_touches_the_users_cards(user, document):
+    cards = _cards(document, 2)
+    schedule_new_cards(user.id, [cards[0].id], now=NOW)
+    db.session.commit()
+
+    reviews = submit_reviews(user.id, {cards[0].id: 5, cards[1].id: 5}, now=NOW)
+    assert [review.flashcard_id for review in reviews] == [cards[0].id]
+    assert reviews[0].due_at == NOW + timedelta(days=1)
+
+def test_backfill_schedules_existing_cards_for_their_owner(user, document):
+    cards = _cards(document, 3)
+    schedule_new_cards(user.id, [cards[0].id], now=NOW)
+    other = User(username='other', email='other@example.com')
+    db.session.add(other)
+    db.session.commit()
+
+    assert schedule_all_unreviewed_cards(now=NOW) == 2
+    assert schedule_all_unreviewed_cards(now=NOW) == 0
+    assert {review.flashcard_id for review in FlashcardReview.query.filter_by(user_id=user.id)} == {c.id for c in cards}
+    assert FlashcardReview.query.filter_by(user_id=other.id).count() == 0
@@ -0,0 +1,114 @@
+import os
+import time
+import pytest
+from studyai_web_deployment.app import db
+from studyai_web_deployment.app.models.models import Blob, Document
+from studyai_web_deployment.app.utils.storage import (
+    GC_GRACE_PERIOD, collect_garbage, delete_document, disk_usage, document_data_dir, migrate_legacy_indexes, store_file
+)
+
+
+def _write(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'x' * size)
+    return str(path)
+
+def _upload(tmp_path, name, content=b'same content'):
+    path = tmp_path / 'uploads' / 'incoming' / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return store_file(str(path))
+
+def _document(user, blob, title='Notes'):
+    document = Document(title=title, filename='notes.txt', file_path=blob.path, blob_sha256=blob.sha256, user_id=user.id)
+    db.session.add(document)
+    db.session.commit()
+    return document
+
+def _age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+def test_legacy_indexes_are_moved_into_the_data_folder(tmp_path, monkeypatch, document):
+    monkeypatch.chdir(tmp_path)
+    _write(tmp_path / 'app' / 'data' / str(document.user_id) / str(document.id) / 'index.faiss', 100)
+    existing = tmp_path / 'data' / str(document.user_id) / '999'
+    _write(existing / 'index.faiss', 5)
+    _write(tmp_path / 'app' / 'data' / str(document.user_id) / '999' / 'index.faiss', 50)
+
+    assert migrate_legacy_indexes() == 1
+    assert migrate_legacy_indexes() == 0
+    assert (tmp_path / document_data_dir(document) / 'index.faiss').stat().st_size == 100
+    assert (existing / 'index.faiss').stat().st_size == 5
+    assert db.session.get(Document, document.id).index_size == 100
+
+def test_disk_usage_counts_uploads_from_before_the_blob_store(tmp_path, user, document):
+    document.file_path = _write(tmp_path / 'uploads' / str(user.id) / 'legacy' / 'notes.txt', 42)
+    db.session.commit()
+
+    assert disk_usage() == [(user, 42, 0, 1)]
+
+def test_identical_uploads_share_one_blob(tmp_path, user):
+    first = _upload(tmp_path, 'a.part')
+    second = _upload(tmp_path, 'b.part')
+    db.session.commit()
+
+    assert first.sha256 == second.sha256
+    assert Blob.query.one().ref_count == 2
+    assert not os.listdir(tmp_path / 'uploads' / 'incoming')
+
+def test_deleting_documents_releases_their_blob_and_index(tmp_path, user):
+    blob = _upload(tmp_path, 'a.part')
+    _upload(tmp_path, 'b.part')
+    first, second = _document(user, blob), _document(user, blob, 'Copy')
+    index = _write(tmp_path / document_data_dir(first) / 'index.faiss', 10)
+
+    delete_document(first)
+    assert not os.path.exists(index)
+    assert Blob.query.one().ref_count == 1
+
+    delete_document(second)
+    assert Blob.query.one().ref_count == 0
+    assert os.path.exists(blob.path)
+    assert Document.query.count() == 0
+
+def test_failed_delete_leaves_files_in_place(tmp_path, user, monkeypatch):
+    document = _document(user, _upload(tmp_path, 'a.part'))
+    index = _write(tmp_path / document_data_dir(document) / 'index.faiss', 10)
+
+    def fail():
+        raise RuntimeError('database went away')
+    monkeypatch.setattr(db.session, 'commit', fail)
+    with pytest.raises(RuntimeError):
+        delete_document(document)
+    assert os.path.exists(index)
+
+def test_dry_run_reports_without_removing(tmp_path, user):
+    document = _document(user, _upload(tmp_path, 'a.part'))
+    path = document.blob.path
+    delete_document(document)
+
+    report = collect_garbage(dry_run=True)
+    assert report['unreferenced_blobs'] == {'count': 1, 'bytes': len(b'same content')}
+    assert os.path.exists(path)
+    assert Blob.query.count() == 1
+
+    assert collect_garbage() == report
+    assert not os.path.exists(path)
+    assert Blob.query.count() == 0
+    assert collect_garbage() == {}
+
+def test_orphans_are_kept_until_the_grace_period_passes(tmp_path, app):
+    orphan_blob = _write(tmp_path / 'uploads' / 'blobs' / 'ab' / 'cd' / 'abcd.123', 7)
+    orphan_index = tmp_path / 'data' / '1' / '5'
+    _write(orphan_index / 'index.faiss', 3)
+
+    assert collect_garbage() == {}
+
+    _age(orphan_blob, GC_GRACE_PERIOD + 1)
+    _age(orphan_index, GC_GRACE_PERIOD + 1)
+    report = collect_garbage()
+    assert report['orphaned_blobs'] == {'count': 1, 'bytes': 7}
+    assert report['orphaned_index_dirs'] == {'count': 1, 'bytes': 3}
+    assert not os.path.exists(orphan_blob)
+    assert not orphan_index.exists()